@@ -9,6 +9,9 @@ from hypergo.service_bus_connection import ServiceBusConnection
 
 
 class AzureServiceBusConnection(ServiceBusConnection):
+    # Service Bus standard tier limit
+    max_message_size = 256 * 1024
+
     def __init__(self, conn_str: str) -> None:
         self._service_bus_client: ServiceBusClient = ServiceBusClient.from_connection_string(conn_str)
 
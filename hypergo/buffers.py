@@ -0,0 +1,89 @@
+import hashlib
+import io
+from typing import Any, Callable, Dict, Optional
+
+from hypergo.storage import Storage
+from hypergo.utility import SERIALIZATION_TAG, TAG_DECODERS, Utility
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None  # type: ignore[assignment]
+
+# buffers larger than this are saved to storage instead of travelling base64-encoded in the message
+DEFAULT_BUFFER_THRESHOLD: int = 1024 * 1024
+
+
+def is_ndarray(obj: Any) -> bool:
+    return numpy is not None and isinstance(obj, numpy.ndarray) and not obj.dtype.hasobject
+
+
+class BufferCodec:
+    """Encodes buffer-protocol values (bytes, bytearray, memoryview, NumPy arrays) for the serialization operation.
+
+    A buffer is stored as its raw bytes with a dtype/shape header rather than
+    pickled. Buffers above threshold bytes are saved once to storage, arrays as
+    .npy files the consumer memory-maps instead of reading; smaller ones are
+    base64-encoded inline. NumPy is only used when it is installed.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None, threshold: int = DEFAULT_BUFFER_THRESHOLD) -> None:
+        self._storage: Optional[Storage] = storage
+        self._threshold: int = threshold
+
+    @property
+    def decoders(self) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+        return {**TAG_DECODERS, "bytes": self.decode_bytes, "ndarray": self.decode_ndarray}
+
+    def _offload(self, content: bytes, suffix: str) -> Optional[str]:
+        if self._storage is None or len(content) <= self._threshold:
+            return None
+        file_name: str = f"bufferkey_{hashlib.blake2b(content, digest_size=16).hexdigest()}{suffix}"
+        if not self._storage.exists(file_name):
+            self._storage.save_bytes(file_name, content)
+        return file_name
+
+    def encode(self, obj: Any) -> Any:
+        if is_ndarray(obj):
+            return self.encode_ndarray(obj)
+        if type(obj) in (bytes, bytearray, memoryview):
+            file_name: Optional[str] = self._offload(bytes(obj), "")
+            if file_name is not None:
+                return {SERIALIZATION_TAG: "bytes", "file": file_name}
+        return Utility.encode_value(obj)
+
+    def encode_ndarray(self, array: Any) -> Dict[str, Any]:
+        tagged: Dict[str, Any] = {SERIALIZATION_TAG: "ndarray", "dtype": array.dtype.str, "shape": list(array.shape)}
+        if array.nbytes > self._threshold and self._storage is not None:
+            npy: io.BytesIO = io.BytesIO()
+            numpy.save(npy, array, allow_pickle=False)
+            tagged["file"] = self._offload(npy.getvalue(), ".npy")
+        else:
+            tagged["data"] = Utility.encode_bytes(numpy.ascontiguousarray(array).data)["data"]
+        return tagged
+
+    def _load(self, file_name: str) -> bytes:
+        if self._storage is None:
+            raise ValueError(f"Reading buffer {file_name} requires a storage")
+        return self._storage.load_bytes(file_name)
+
+    def decode_bytes(self, tagged: Dict[str, Any]) -> bytes:
+        if "file" in tagged:
+            return self._load(tagged["file"])
+        return bytes(TAG_DECODERS["bytes"](tagged))
+
+    def decode_ndarray(self, tagged: Dict[str, Any]) -> Any:
+        if numpy is None:
+            raise ImportError("numpy is required to deserialize an ndarray")
+        if "file" not in tagged:
+            raw: bytearray = bytearray(TAG_DECODERS["bytes"](tagged))
+            return numpy.frombuffer(raw, dtype=numpy.dtype(tagged["dtype"])).reshape(tagged["shape"])
+        path: Optional[str] = self._storage.local_path(tagged["file"]) if self._storage is not None else None
+        if path is not None:
+            # read-only view straight onto the stored file
+            return numpy.load(path, mmap_mode="r", allow_pickle=False)
+        return numpy.load(io.BytesIO(self._load(tagged["file"])), allow_pickle=False)
+
+
+# inline arrays can be read back without a storage
+TAG_DECODERS.setdefault("ndarray", BufferCodec().decode_ndarray)
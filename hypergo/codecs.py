@@ -0,0 +1,156 @@
+import base64
+import bz2
+import hashlib
+import lzma
+import re
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple, Union
+
+from hypergo.envelope import Envelope
+from hypergo.storage import Storage
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class Codec(NamedTuple):
+    name: str
+    compress: Callable[[Buffer, Optional[int]], bytes]
+    decompress: Callable[[Buffer], bytes]
+
+
+def _zlib_compress(data: Buffer, level: Optional[int]) -> bytes:
+    return zlib.compress(data, -1 if level is None else level)
+
+
+def _bz2_compress(data: Buffer, level: Optional[int]) -> bytes:
+    return bz2.compress(data, 9 if level is None else level)
+
+
+def _lzma_compress(data: Buffer, level: Optional[int]) -> bytes:
+    return lzma.compress(data, preset=level)
+
+
+CODECS: Dict[str, Codec] = {
+    codec.name: codec
+    for codec in [
+        Codec("zlib", _zlib_compress, zlib.decompress),
+        Codec("bz2", _bz2_compress, bz2.decompress),
+        Codec("lzma", _lzma_compress, lzma.decompress),
+    ]
+}
+
+DEFAULT_CODEC: str = "lzma"
+
+# layer name of values compressed with raw deflate against a shared zlib dictionary
+DICTIONARY_CODEC: str = "zdict"
+# deflate only looks back 32KiB, so a longer dictionary is never used
+DICTIONARY_SIZE: int = 32 * 1024
+# JSON strings (with a trailing ": " when they are keys), runs of other text, and commas
+FRAGMENT: Pattern[bytes] = re.compile(rb'"(?:[^"\\]|\\.)*"(?:: )?|[^",]+|,')
+
+
+def register_codec(codec: Codec) -> None:
+    CODECS[codec.name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError as error:
+        raise ValueError(f"Unknown compression codec '{name}'; available: {sorted(CODECS)}") from error
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """A zlib dictionary of the fragments shared by the most samples.
+
+    Fragments (and pairs of adjacent fragments) are scored by the number of
+    samples they appear in times their length; the best ones that fit in size
+    are concatenated with the most valuable last, closest to the data.
+    """
+    frequency, count = _fragment_frequency(samples)
+    minimum: int = 2 if count > 1 else 1
+    candidates: List[bytes] = sorted(
+        (fragment for fragment, n in frequency.items() if n >= minimum and len(fragment) >= 3),
+        key=lambda fragment: (frequency[fragment] * len(fragment), fragment),
+        reverse=True,
+    )
+    return b"".join(reversed(_fitting(candidates, size)))
+
+
+def _fragment_frequency(samples: Iterable[bytes]) -> Tuple[Counter[bytes], int]:
+    """The number of samples each fragment, or pair of adjacent fragments, appears in, and the number of samples."""
+    frequency: Counter[bytes] = Counter()
+    count: int = 0
+    for sample in samples:
+        fragments: List[bytes] = FRAGMENT.findall(sample)
+        frequency.update(set(fragments) | {a + b for a, b in zip(fragments, fragments[1:])})
+        count += 1
+    return frequency, count
+
+
+def _fitting(fragments: List[bytes], size: int) -> List[bytes]:
+    """The fragments, in order, that fit in size, skipping any that would overflow it."""
+    chosen: List[bytes] = []
+    total: int = 0
+    for fragment in fragments:
+        if total + len(fragment) <= size:
+            chosen.append(fragment)
+            total += len(fragment)
+    return chosen
+
+
+class Dictionaries:
+    """zlib dictionaries kept in a Storage under an id derived from their content, cached once loaded."""
+
+    _loaded: Dict[str, bytes] = {}
+
+    def __init__(self, storage: Storage) -> None:
+        self._storage: Storage = storage
+
+    @staticmethod
+    def dictionary_id(zdict: bytes) -> str:
+        return hashlib.sha256(zdict).hexdigest()[:16]
+
+    def save(self, zdict: bytes) -> str:
+        dictionary_id: str = Dictionaries.dictionary_id(zdict)
+        self._storage.save(f"dictionary_{dictionary_id}", base64.b64encode(zdict).decode("ascii"))
+        Dictionaries._loaded[dictionary_id] = zdict
+        return dictionary_id
+
+    def load(self, dictionary_id: str) -> bytes:
+        zdict: Optional[bytes] = Dictionaries._loaded.get(dictionary_id)
+        if zdict is None:
+            zdict = base64.b64decode(self._storage.load(f"dictionary_{dictionary_id}"))
+            if Dictionaries.dictionary_id(zdict) != dictionary_id:
+                raise ValueError(f"Stored dictionary does not match its id {dictionary_id}")
+            Dictionaries._loaded[dictionary_id] = zdict
+        return zdict
+
+
+def compress(envelope: Envelope, codec: str = DEFAULT_CODEC, level: Optional[int] = None) -> Envelope:
+    """envelope with its payload compressed by codec, recorded as the codec's layer."""
+    return envelope.push([codec], get_codec(codec).compress(envelope.payload, level))
+
+
+def compress_with_dictionary(
+    envelope: Envelope, dictionary_id: str, zdict: bytes, level: Optional[int] = None
+) -> Envelope:
+    """envelope compressed with raw deflate against zdict, recorded with the dictionary id."""
+    compressor = zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    return envelope.push([DICTIONARY_CODEC, dictionary_id], compressor.compress(envelope.payload) + compressor.flush())
+
+
+def is_compressed(envelope: Envelope) -> bool:
+    return envelope.top is not None and (envelope.top[0] in CODECS or envelope.top[0] == DICTIONARY_CODEC)
+
+
+def decompress(envelope: Envelope, dictionaries: Optional[Dictionaries] = None) -> Envelope:
+    """envelope with its outermost compression layer removed, whichever codec wrote it."""
+    layer, payload = envelope.expect(DICTIONARY_CODEC, *CODECS)
+    if layer[0] != DICTIONARY_CODEC:
+        return envelope.pop(get_codec(layer[0]).decompress(payload))
+    if dictionaries is None:
+        raise ValueError(f"Decompressing with dictionary {layer[1]} requires a storage to load it from")
+    decompressor = zlib.decompressobj(-15, zdict=dictionaries.load(layer[1]))
+    return envelope.pop(decompressor.decompress(payload) + decompressor.flush())
@@ -1,18 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Any, cast
+from typing import Any, Optional, cast
 
 from hypergo.config import ConfigType
 from hypergo.executor import Executor
+from hypergo.executor_cache import ExecutorCache
 from hypergo.logger import function_log, logger
 from hypergo.message import MessageType
 from hypergo.monitor import collect_metrics
 
 
 class Connection(ABC):
+    executors: ExecutorCache = ExecutorCache()
+    # largest message, in bytes, the transport accepts; None for no limit
+    max_message_size: Optional[int] = None
 
     def general_consume(self, message: MessageType, **kwargs: Any) -> None:
         config: ConfigType = kwargs.pop("config")
-        executor: Executor = Executor(config, **kwargs)
+        kwargs.setdefault("max_message_size", self.max_message_size)
+        executor: Executor = self.executors.get(config, **kwargs)
         self.__send_message(executor=executor, message=message, config=config)
 
     @function_log
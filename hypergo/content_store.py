@@ -0,0 +1,359 @@
+import hashlib
+import json
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Callable, Dict, Generator, Iterable, List, MutableMapping, Optional, Pattern, Tuple, cast
+from weakref import WeakKeyDictionary
+
+from hypergo.storage import Storage
+from hypergo.utility import MISSING, LazyValue, Utility, path_get
+
+HASHES: Dict[str, Callable[[bytes], str]] = {
+    "md5": lambda content: hashlib.md5(content).hexdigest(),
+    # faster than md5 on 64-bit CPUs, truncated to the same 128 bits
+    "blake2b": lambda content: hashlib.blake2b(content, digest_size=16).hexdigest(),
+}
+
+DEFAULT_MAXSIZE: int = 65536
+
+# manifests of payloads stored in chunks are named with this prefix instead
+CHUNKED_PREFIX: str = "chunkedkey_"
+DEFAULT_CHUNK_SIZE: int = 4 * 1024 * 1024
+
+# how many levels of nested objects an offset index covers by default
+DEFAULT_INDEX_DEPTH: int = 2
+
+Fields = Dict[str, Dict[str, Any]]
+
+
+def encode_indexed(value: Any, depth: int = DEFAULT_INDEX_DEPTH) -> Tuple[str, Fields]:
+    """json.dumps(value), together with the span of every object field down to depth.
+
+    The text is identical to json.dumps, so the content key does not depend on
+    whether an index was built. It is ASCII, so character and byte offsets agree.
+    Each field maps to {"span": [start, end]} plus "fields" for its own fields.
+    """
+    parts: List[str] = []
+    position: List[int] = [0]
+
+    def emit(text: str) -> None:
+        parts.append(text)
+        position[0] += len(text)
+
+    def walk(node: Any, remaining: int) -> Optional[Fields]:
+        if remaining == 0 or not isinstance(node, dict) or not node or not all(isinstance(k, str) for k in node):
+            emit(json.dumps(node))
+            return None
+        fields: Fields = {}
+        emit("{")
+        for number, (name, child) in enumerate(node.items()):
+            emit(f"{', ' if number else ''}{json.dumps(name)}: ")
+            start: int = position[0]
+            children: Optional[Fields] = walk(child, remaining - 1)
+            fields[name] = {"span": [start, position[0]]}
+            if children is not None:
+                fields[name]["fields"] = children
+        emit("}")
+        return fields
+
+    index: Fields = walk(value, depth) or {}
+    return "".join(parts), index
+
+
+class ContentStore:
+    """Blobs saved under a name derived from their content.
+
+    A name always denotes the same content, so a blob already stored is never
+    written again, and anything cached by name never goes stale.
+    """
+
+    # (storage type, root, sub path) -> store, for storages that can tell their root
+    _rooted: Dict[Tuple[type, str, str], "ContentStore"] = {}
+    # storage -> store, for the others
+    _instances: "WeakKeyDictionary[Storage, ContentStore]" = WeakKeyDictionary()
+    _instances_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, storage: Storage, prefix: str = "storagekey_", maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self._storage: Storage = storage
+        self._prefix: str = prefix
+        self._key_pattern: Pattern[str] = re.compile(f"({re.escape(prefix)}|{CHUNKED_PREFIX})[0-9a-f]{{32}}\\Z")
+        self._maxsize: int = maxsize
+        self._index: "OrderedDict[str, None]" = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+
+    @staticmethod
+    def for_storage(base_storage: Storage, sub_path: str = "passbyreference") -> "ContentStore":
+        """The content store over sub_path of base_storage, shared by everything using the same files.
+
+        Storages are told apart by their root, so a fresh storage instance over
+        the same files finds the same store and its cache.
+        """
+        root: Optional[str] = base_storage.storage_root
+        if root is None:
+            return ContentStore._shared(ContentStore._instances, base_storage, base_storage, sub_path)
+        return ContentStore._shared(ContentStore._rooted, (type(base_storage), root, sub_path), base_storage, sub_path)
+
+    @staticmethod
+    def _shared(
+        instances: MutableMapping[Any, "ContentStore"], key: Any, base_storage: Storage, sub_path: str
+    ) -> "ContentStore":
+        with ContentStore._instances_lock:
+            store: Optional[ContentStore] = instances.get(key)
+            if store is None:
+                store = instances[key] = ContentStore(base_storage.use_sub_path(sub_path))
+            return store
+
+    def key(self, content: str, hash_name: str = "md5", prefix: Optional[str] = None) -> str:
+        try:
+            digest: Callable[[bytes], str] = HASHES[hash_name]
+        except KeyError as error:
+            raise ValueError(f"Unknown hash '{hash_name}'; available: {sorted(HASHES)}") from error
+        return f"{self._prefix if prefix is None else prefix}{digest(content.encode('utf-8'))}"
+
+    @staticmethod
+    def is_chunked(key: str) -> bool:
+        return key.startswith(CHUNKED_PREFIX)
+
+    def is_key(self, value: Any) -> bool:
+        """Whether value is a key this store hands out, i.e. a claim check rather than an inlined value."""
+        return isinstance(value, str) and self._key_pattern.match(value) is not None
+
+    def _remember(self, key: str) -> None:
+        with self._lock:
+            self._index[key] = None
+            self._index.move_to_end(key)
+            if len(self._index) > self._maxsize:
+                self._index.popitem(last=False)
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            known: bool = key in self._index
+        if not known and self._storage.exists(key):
+            self._remember(key)
+            known = True
+        return known
+
+    def put(self, content: str, hash_name: str = "md5", dedup: bool = True, prefix: Optional[str] = None) -> str:
+        """Store content and return its key, skipping the write when dedup finds it already stored."""
+        key: str = self.key(content, hash_name, prefix)
+        if dedup:
+            found: bool = self.contains(key)
+            self._count("hits" if found else "misses")
+            if found:
+                return key
+        self._storage.save(key, content)
+        self._count("writes")
+        self._remember(key)
+        return key
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def load(self, key: str) -> str:
+        return self._storage.load(key)
+
+    def put_indexed(
+        self, value: Any, hash_name: str = "md5", dedup: bool = True, depth: int = DEFAULT_INDEX_DEPTH
+    ) -> str:
+        """Store value like put, plus an offset index of its fields as <key>.index."""
+        text, fields = encode_indexed(value, depth)
+        key: str = self.put(text, hash_name, dedup)
+        if fields and not (dedup and self._storage.exists(f"{key}.index")):
+            self._storage.save(f"{key}.index", json.dumps(fields))
+        return key
+
+    def load_range(self, key: str, start: int, end: int) -> str:
+        return self._storage.load_range(key, start, end)
+
+    def load_lazy(self, key: str) -> Any:
+        """The value stored at key, as a LazyReference when it has an offset index."""
+        if not self._storage.exists(f"{key}.index"):
+            return Utility.objectify(self.load(key))
+        return LazyReference(self, key, json.loads(self._storage.load(f"{key}.index")))
+
+    @staticmethod
+    def _pieces(value: Any) -> Tuple[str, Iterable[str]]:
+        """The stored format of value and its encoding as a stream of text pieces.
+
+        Lists and iterators are stored as JSON lines, one record per line, so they
+        can be read back a record at a time; anything else as one JSON document.
+        """
+        if isinstance(value, (list, tuple, IteratorABC)):
+            return "records", (json.dumps(record) + "\n" for record in value)
+        return "json", json.JSONEncoder().iterencode(value)
+
+    def put_chunked(
+        self, value: Any, hash_name: str = "md5", dedup: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> str:
+        """Store value as chunks of about chunk_size characters plus a manifest, and return the manifest's key.
+
+        value is encoded incrementally, so neither it (when it is an iterator) nor
+        its full JSON text is ever held in memory at once. Records never straddle
+        chunks. Each chunk is itself a content-addressed blob.
+        """
+        payload_format, pieces = ContentStore._pieces(value)
+        chunks: List[str] = []
+        buffer: List[str] = []
+        buffered: int = 0
+        size: int = 0
+        for piece in pieces:
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= chunk_size:
+                chunks.append(self.put("".join(buffer), hash_name, dedup))
+                size += buffered
+                buffer, buffered = [], 0
+        if buffer or not chunks:
+            chunks.append(self.put("".join(buffer), hash_name, dedup))
+            size += buffered
+        manifest: str = json.dumps({"format": payload_format, "size": size, "chunks": chunks})
+        return self.put(manifest, hash_name, dedup, CHUNKED_PREFIX)
+
+    def manifest(self, key: str) -> Dict[str, Any]:
+        return cast(Dict[str, Any], json.loads(self.load(key)))
+
+    def iter_chunks(self, key: str) -> Generator[str, None, None]:
+        """The stored text of a chunked payload, one chunk at a time."""
+        for chunk_key in self.manifest(key)["chunks"]:
+            yield self.load(chunk_key)
+
+    def iter_records(self, key: str) -> Generator[Any, None, None]:
+        """The records of a chunked payload, reading one chunk at a time."""
+        manifest: Dict[str, Any] = self.manifest(key)
+        if manifest["format"] != "records":
+            # a single document is its only record
+            yield self.load_chunked(key)
+            return
+        for chunk_key in manifest["chunks"]:
+            for line in self.load(chunk_key).splitlines():
+                yield json.loads(line)
+
+    def load_chunked(self, key: str) -> Any:
+        manifest: Dict[str, Any] = self.manifest(key)
+        if manifest["format"] == "records":
+            return list(self.iter_records(key))
+        return json.loads("".join(self.load(chunk_key) for chunk_key in manifest["chunks"]))
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        lookups: int = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._index),
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+class LazyReference(LazyValue):
+    """A stored object whose indexed fields are read and parsed only when looked up."""
+
+    def __init__(
+        self, store: ContentStore, key: str, fields: Fields, span: Optional[Tuple[int, int]] = None
+    ) -> None:
+        self._store: ContentStore = store
+        self._key: str = key
+        self._fields: Fields = fields
+        self._span: Optional[Tuple[int, int]] = span
+        self._value: Any = MISSING
+
+    def lookup(self, key: Any) -> Any:
+        if self._value is not MISSING:
+            return path_get(self._value, key)
+        # every field of an indexed object is in the index
+        field: Optional[Dict[str, Any]] = self._fields.get(key) if isinstance(key, str) else None
+        if field is None:
+            return MISSING
+        start, end = field["span"]
+        if "fields" in field:
+            return LazyReference(self._store, self._key, field["fields"], (start, end))
+        return json.loads(self._store.load_range(self._key, start, end))
+
+    def resolve(self) -> Any:
+        if self._value is MISSING:
+            if self._span is None:
+                self._value = Utility.objectify(self._store.load(self._key))
+            else:
+                self._value = json.loads(self._store.load_range(self._key, *self._span))
+        return self._value
+
+
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+
+
+class ReadCache:
+    """Byte-bounded LRU of ContentStore blobs; parsed hits are unpickled private copies."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self._max_bytes: int = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry: Optional[Tuple[str, bytes]] = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, raw: str, parsed: Any) -> None:
+        entry: Tuple[str, bytes] = (raw, pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL))
+        size: int = len(entry[0]) + len(entry[1])
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, (evicted_raw, evicted_parsed) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted_raw) + len(evicted_parsed)
+                self._stats["evictions"] += 1
+
+    def raw(self, key: str, load: Callable[[str], str]) -> str:
+        entry: Optional[Tuple[str, bytes]] = self._get(key)
+        if entry is not None:
+            return entry[0]
+        raw: str = load(key)
+        self._put(key, raw, Utility.objectify(raw))
+        return raw
+
+    def parsed(self, key: str, load: Callable[[str], str]) -> Any:
+        """The parsed content of key, read through load on a miss; the caller owns the value returned."""
+        entry: Optional[Tuple[str, bytes]] = self._get(key)
+        if entry is not None:
+            return pickle.loads(entry[1])
+        raw: str = load(key)
+        parsed: Any = Utility.objectify(raw)
+        self._put(key, raw, parsed)
+        return parsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups: int = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+READ_CACHE: ReadCache = ReadCache()
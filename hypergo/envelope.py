@@ -0,0 +1,95 @@
+import base64
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+Layer = List[Any]
+
+
+class Envelope:
+    """A transformed value kept as bytes between transform operations.
+
+    The serialization → encryption → compression chain used to hand strings from
+    one operation to the next, each layer JSON-encoding and base64-encoding the
+    previous layer's base64 text. An Envelope instead carries the raw payload
+    plus the list of layers applied to it, and is base64-encoded exactly once
+    when it is sealed for the wire:
+
+        "hgo1:" + base64(len(header) as 4 bytes + header + payload)
+
+    where header is the JSON list of layers, innermost first.
+    """
+
+    PREFIX: str = "hgo1:"
+
+    def __init__(self, payload: Union[bytes, memoryview], layers: Optional[List[Layer]] = None) -> None:
+        self._payload: Union[bytes, memoryview] = payload
+        self._layers: List[Layer] = layers or []
+
+    @property
+    def payload(self) -> Union[bytes, memoryview]:
+        return self._payload
+
+    @property
+    def layers(self) -> List[Layer]:
+        return list(self._layers)
+
+    @property
+    def top(self) -> Optional[Layer]:
+        return self._layers[-1] if self._layers else None
+
+    @staticmethod
+    def seal_nested(value: Any) -> str:
+        if isinstance(value, Envelope):
+            return value.encode()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def wrap(value: Any) -> "Envelope":
+        """Envelope for value: itself if it already is one, otherwise its JSON encoding."""
+        if isinstance(value, Envelope):
+            return value
+        return Envelope(json.dumps(value, default=Envelope.seal_nested).encode("utf-8"))
+
+    def unwrap(self) -> Any:
+        """The value once every layer has been removed; otherwise the envelope itself."""
+        if self._layers:
+            return self
+        return json.loads(bytes(self._payload).decode("utf-8"))
+
+    def push(self, layer: Layer, payload: Union[bytes, memoryview]) -> "Envelope":
+        return Envelope(payload, self._layers + [layer])
+
+    def pop(self, payload: Union[bytes, memoryview]) -> "Envelope":
+        return Envelope(payload, self._layers[:-1])
+
+    def encode(self) -> str:
+        header: bytes = json.dumps(self._layers, separators=(",", ":")).encode("utf-8")
+        return Envelope.PREFIX + base64.b64encode(len(header).to_bytes(4, "big") + header + self._payload).decode(
+            "ascii"
+        )
+
+    @staticmethod
+    def is_encoded(value: Any) -> bool:
+        return isinstance(value, str) and value.startswith(Envelope.PREFIX)
+
+    @staticmethod
+    def decode(encoded: str) -> "Envelope":
+        raw: memoryview = memoryview(base64.b64decode(encoded[len(Envelope.PREFIX):]))
+        header_len: int = int.from_bytes(raw[:4], "big")
+        layers: List[Layer] = json.loads(bytes(raw[4: 4 + header_len]).decode("utf-8"))
+        return Envelope(raw[4 + header_len:], layers)
+
+    @staticmethod
+    def open(value: Any) -> Optional["Envelope"]:
+        """The envelope held by value, or None if value was not written as one (legacy format)."""
+        if isinstance(value, Envelope):
+            return value
+        if Envelope.is_encoded(value):
+            return Envelope.decode(value)
+        return None
+
+    def expect(self, *names: str) -> Tuple[Layer, Union[bytes, memoryview]]:
+        layer: Optional[Layer] = self.top
+        if layer is None or layer[0] not in names:
+            raise ValueError(f"Expected a {'/'.join(names)} layer but found {layer}")
+        return layer, self._payload
@@ -1,88 +1,34 @@
+import copy
 import importlib
 import inspect
-import re
 from functools import wraps
-from typing import (Any, Callable, Dict, Generator, List, Mapping, Match,
-                    Optional, Set, cast)
+from typing import (Any, Callable, Dict, Generator, List, Mapping, Optional,
+                    cast)
 
 from hypergo.config import ConfigType
 from hypergo.context import ContextType
 from hypergo.local_storage import LocalStorage
 from hypergo.loggers.base_logger import BaseLogger as Logger
 from hypergo.message import MessageType
+from hypergo.routing import RoutingKeyEngine
 from hypergo.secrets import LocalSecrets, Secrets
 from hypergo.storage import Storage
-from hypergo.transform import Transform
-from hypergo.utility import Utility, traverse_datastructures
-
-
-def do_question_mark(context: Dict[str, Any], input_string: Any) -> str:
-    def find_best_key(field_path: List[str], routingkey: str) -> str:
-        rk_set: Set[str] = set(routingkey.split("."))
-        matched_key: str = ""
-        maxlen: int = 0
-        for key in Utility.deep_get(context, ".".join(field_path)):
-            key_set: Set[str] = set(key.split("."))
-            if key_set.intersection(rk_set) == key_set and len(key_set) > maxlen:
-                maxlen = len(key_set)
-                matched_key = key
-        return re.sub(r"\.", "\\.", matched_key)
-
-    node_path: List[str] = []
-    for node in input_string.split("."):
-        node_path.append(
-            find_best_key(node_path, Utility.deep_get(context, "message.routingkey")) if node == "?" else node
-        )
-    return ".".join(node_path)
-
-
-def do_substitution(value: Any, data: Dict[str, Any]) -> Any:
-    @traverse_datastructures
-    def substitute(string: str, data: Dict[str, Any]) -> Any:
-        result = string
-        if isinstance(string, str):
-            matched_regex: Optional[Match[str]] = re.match(r"^{([^}]+)}$", string)
-            result = (
-                Utility.deep_get(
-                    data,
-                    do_question_mark(data, matched_regex.group(1)),
-                    matched_regex.group(0),
-                )
-                # version 2.0.0 and above
-                if matched_regex
-                # backward compatibility
-                else re.sub(
-                    r"{([^}]+)}",
-                    lambda match: str(
-                        Utility.deep_get(
-                            data,
-                            do_question_mark(data, match.group(1)),
-                            match.group(0),
-                        )
-                    ),
-                    string,
-                )
-            )
-
-            # We were substituting message.* in the string with the actual
-            # payload
-            if re.match(r"^.*\{message\.[^\}]+\}.*$", string):
-                return result
-
-        if result != string:
-            result = substitute(result, data)
-        return result
-
-    return substitute(value, data)
+from hypergo.substitution import (BindingPlan, ConfigTemplate,
+                                  do_question_mark, do_substitution)
+from hypergo.transform import Transform, TransformPipeline
+from hypergo.utility import Utility
+
+# do_question_mark and do_substitution moved to hypergo.substitution and are still importable from here
+__all__ = ["Executor", "configsubstitution", "do_question_mark", "do_substitution"]
 
 
 def configsubstitution(func: Callable[..., Any]) -> Callable[..., Any]:
     @wraps(func)
     def wrapper(self: Any, data: Any) -> Any:
-        input_bindings = Utility.deep_get(self.config, "input_bindings")
-        self.config = do_substitution(self.config, {"config": self.config, "message": data})
-        Utility.deep_set(self.config, "input_bindings", input_bindings)
-        return func(self, data)
+        # substitute into a per-message snapshot bound to a lightweight copy of the
+        # executor; the shared executor and its config are never mutated
+        config: ConfigType = self.config_template.snapshot({"config": self.config_template.source, "message": data})
+        return func(self.bind(config), data)
 
     return wrapper
 
@@ -101,22 +47,31 @@ class Executor:
         params: Mapping[str, inspect.Parameter] = inspect.signature(func).parameters
         return [params[k].annotation for k in list(params.keys())]
 
+    @staticmethod
+    def routing_engine(config_template: ConfigTemplate) -> RoutingKeyEngine:
+        resolved: Dict[str, Any] = config_template.resolved
+        return RoutingKeyEngine(resolved["input_keys"], resolved["output_keys"])
+
     def __init__(self, config: ConfigType, **kwargs: Any) -> None:
         self._config: ConfigType = config
         self._func_spec: Callable[..., Any] = Executor.func_spec(config["lib_func"])
-        self._arg_spec: List[type] = Executor.arg_spec(self._func_spec)
-        self._storage: Optional[Storage] = kwargs.pop("storage", LocalStorage())
-        self._secrets: Optional[Secrets] = kwargs.pop("secrets", LocalSecrets())
-        self._logger: Optional[Logger] = kwargs.pop("logger", Logger())
+        self._config_template: ConfigTemplate = ConfigTemplate(cast(Dict[str, Any], config))
+        self._binding_plan: BindingPlan = BindingPlan(config["input_bindings"], Executor.arg_spec(self._func_spec))
+        self._routing: RoutingKeyEngine = Executor.routing_engine(self._config_template)
+        storage: Optional[Storage] = kwargs.pop("storage") if "storage" in kwargs else LocalStorage()
+        secrets: Optional[Secrets] = kwargs.pop("secrets") if "secrets" in kwargs else LocalSecrets()
+        # the pipeline also holds the storage and secrets
+        self._transforms: TransformPipeline = TransformPipeline(self._config_template.resolved, storage, secrets)
+        self._logger: Optional[Logger] = kwargs.pop("logger") if "logger" in kwargs else Logger()
         self.__dict__.update(kwargs)
 
     @property
     def storage(self) -> Optional[Storage]:
-        return self._storage
+        return self._transforms.storage
 
     @property
     def secrets(self) -> Optional[Secrets]:
-        return self._secrets
+        return self._transforms.secrets
 
     @property
     def logger(self) -> Optional[Logger]:
@@ -133,54 +88,72 @@ class Executor:
     @config.setter
     def config(self, config: ConfigType) -> None:
         self._config = config
+        self._config_template = ConfigTemplate(cast(Dict[str, Any], config))
+        self._binding_plan = BindingPlan(config["input_bindings"], self._binding_plan.arg_spec)
+        self._routing = Executor.routing_engine(self._config_template)
+        self._transforms = TransformPipeline(self._config_template.resolved, self.storage, self.secrets)
+
+    @property
+    def config_template(self) -> ConfigTemplate:
+        return self._config_template
+
+    def _copy(self, **attributes: Any) -> "Executor":
+        """A shallow copy of this executor with attributes replaced."""
+        bound: Executor = copy.copy(self)
+        bound.__dict__.update(attributes)
+        return bound
+
+    def bind(self, config: ConfigType) -> "Executor":
+        """Return a shallow copy of this executor that sees config as its per-message config."""
+        return self._copy(_config=config)
+
+    def rebind(self, **kwargs: Any) -> "Executor":
+        """Return a shallow copy of this executor using the given storage/secrets/logger and attributes."""
+        storage: Optional[Storage] = kwargs.pop("storage", self.storage)
+        secrets: Optional[Secrets] = kwargs.pop("secrets", self.secrets)
+        kwargs["_logger"] = kwargs.pop("logger", self._logger)
+        if storage is not self.storage or secrets is not self.secrets:
+            # content stores and key rings are shared by storage root and secrets type, so this keeps their caches
+            kwargs["_transforms"] = TransformPipeline(self._config_template.resolved, storage, secrets)
+        return self._copy(**kwargs)
+
+    def is_bound_to(self, **kwargs: Any) -> bool:
+        """Whether this executor already uses the given storage/secrets/logger and attributes."""
+        for name, value in kwargs.items():
+            current: Any = getattr(self, name, object())
+            if current is not value and current != value:
+                return False
+        return True
 
     def get_args(self, context: ContextType) -> List[Any]:
-        return [
-            val if argtype == inspect.Parameter.empty else Utility.safecast(argtype, val)
-            for val, argtype in zip(
-                do_substitution(
-                    Utility.deep_get(self.config, "input_bindings"),
-                    cast(Dict[str, Any], context),
-                ),
-                self._arg_spec,
-            )
-        ]
+        plan: BindingPlan = self._binding_plan.for_bindings(Utility.deep_get(self.config, "input_bindings"))
+        return plan.apply(cast(Dict[str, Any], context))
+
+    @property
+    def transforms(self) -> TransformPipeline:
+        return self._transforms
+
+    @property
+    def routing(self) -> RoutingKeyEngine:
+        return self._routing
 
     def get_output_routing_key(self, input_message_routing_key: str) -> str:
-        routing_key_set: Set[str] = set(input_message_routing_key.split("."))
-        tokens: List[str] = []
-        for input_key in self.config["input_keys"]:
-            # hypergo-144 dynamic routing key only for generic components
-            # output key will contain context derived from the previous
-            # producer routing key
-            input_key_set: Set[str] = set(input_key.split("."))
-            intersection_set: Set[str] = routing_key_set.intersection(input_key_set)
-            # check if the routing key is in the input_key
-            if intersection_set == input_key_set:
-                # set difference operation to remove the subset of the routing key captured by the component
-                # from its input_key and append it to tokens
-                tokens.append(".".join(routing_key_set.difference(intersection_set)))
-        token: str = self.organize_tokens(tokens)
-        output_tokens: List[str] = [
-            re.sub(r"(?<=\.)\?(?=\.)|^\?|(?<=\.)\?$|^\?$", token, output_key)
-            for output_key in self.config["output_keys"]
-        ]
-        return self.organize_tokens(output_tokens)
+        # hypergo-144 dynamic routing key only for generic components
+        # output key will contain context derived from the previous
+        # producer routing key
+        engine: RoutingKeyEngine = self._routing
+        if self.config["input_keys"] is not engine.input_keys or self.config["output_keys"] is not engine.output_keys:
+            # keys were substituted per message; nothing worth caching
+            engine = RoutingKeyEngine(self.config["input_keys"], self.config["output_keys"], maxsize=0)
+        return engine.output_routing_key(input_message_routing_key)
 
     @configsubstitution
-    @Transform.operation("contextualization")
-    @Transform.operation("pass_by_reference")
-    @Transform.operation("compression")
-    @Transform.operation("encryption")
-    @Transform.operation("serialization")
-    @Transform.operation("transaction")
+    @Transform.pipeline
     def execute(self, context: Any) -> Generator[MessageType, None, None]:
-        # This mutates config with substitutions - not necessary for input binding substitution
-        # Unclear which approach is better - do we want the original config with references?  Or
-        # Do we want to mutate config and replace values with substitutions?
+        # Substitute the remaining templated fields of the config against the full context.
         # This is useful if we want to configure routingkeys with paramaterized values - So
         # We should keep it
-        context["config"] = do_substitution(context["config"], cast(Dict[str, Any], context))
+        context["config"] = self.config_template.snapshot(cast(Dict[str, Any], context), context["config"])
         args: List[Any] = self.get_args(context)
         execution: Any = self._func_spec(*args)
 
@@ -0,0 +1,85 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from hypergo.config import ConfigType
+from hypergo.executor import Executor
+from hypergo.utility import Utility
+
+DEFAULT_MAXSIZE: int = 128
+
+
+class ExecutorCache:
+    """Bounded LRU registry of warm executors keyed by a config fingerprint.
+
+    Building an Executor imports the lib_func module, inspects its signature and
+    compiles the config, so connections reuse one executor per distinct config.
+    A call with different storage/secrets/logger objects gets the cached
+    executor rebound to them, which only rebuilds its transform pipeline;
+    callers that reuse their collaborators avoid even that. The fingerprint is
+    remembered per config object, so a config must not be changed once used.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self._maxsize: int = maxsize
+        self._executors: "OrderedDict[str, Executor]" = OrderedDict()
+        # id(config) -> (config, fingerprint); the config is kept so its id is not reused
+        self._fingerprints: "OrderedDict[int, Tuple[ConfigType, str]]" = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @staticmethod
+    def fingerprint(config: ConfigType) -> str:
+        return Utility.hash(json.dumps(config, sort_keys=True, default=str))
+
+    def cache_key(self, config: ConfigType) -> str:
+        with self._lock:
+            entry: Optional[Tuple[ConfigType, str]] = self._fingerprints.get(id(config))
+            if entry is not None and entry[0] is config:
+                self._fingerprints.move_to_end(id(config))
+                return entry[1]
+        fingerprint: str = ExecutorCache.fingerprint(config)
+        with self._lock:
+            self._fingerprints[id(config)] = (config, fingerprint)
+            while len(self._fingerprints) > self._maxsize:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def get(self, config: ConfigType, **kwargs: Any) -> Executor:
+        key: str = self.cache_key(config)
+        with self._lock:
+            executor: Optional[Executor] = self._executors.get(key)
+            if executor is not None:
+                self._executors.move_to_end(key)
+                self._hits += 1
+        if executor is not None:
+            return executor if executor.is_bound_to(**kwargs) else executor.rebind(**kwargs)
+
+        executor = Executor(config, **kwargs)
+        with self._lock:
+            self._misses += 1
+            self._executors[key] = executor
+            self._executors.move_to_end(key)
+            while len(self._executors) > self._maxsize:
+                self._executors.popitem(last=False)
+                self._evictions += 1
+        return executor
+
+    def clear(self) -> None:
+        with self._lock:
+            self._executors.clear()
+            self._fingerprints.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._executors),
+                "maxsize": self._maxsize,
+            }
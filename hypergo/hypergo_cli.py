@@ -1,10 +1,13 @@
 import datetime
+import json
 import os
 import sys
-from typing import List
+from functools import cached_property
+from typing import Generator, Iterable, List
 
 from colors import color
 
+from hypergo import codecs
 from hypergo.config import Config, ConfigType
 from hypergo.graph import graph as hypergraph
 from hypergo.local_storage import LocalStorage
@@ -14,7 +17,24 @@ from hypergo.stdio_connection import StdioConnection
 from hypergo.version import get_version
 
 
+SAMPLE_PREFIX: str = "storagekey_"
+
+
+def is_blob(name: str) -> bool:
+    """Whether a file found under a storage directory holds a stored message, not an index, version, lock or buffer."""
+    return name.startswith(SAMPLE_PREFIX) and "." not in name
+
+
 class HypergoCli:
+    # one storage and secrets per CLI, so the connection's cached executor keeps using them
+    @cached_property
+    def storage(self) -> LocalStorage:
+        return LocalStorage()
+
+    @cached_property
+    def secrets(self) -> LocalSecrets:
+        return LocalSecrets()
+
     @property
     def prompt(self) -> str:
         return f"{color('hypergo', fg='#33ff33')} {color('∵', fg='#33ff33')} "
@@ -44,7 +64,7 @@ class HypergoCli:
                 raise BrokenPipeError("No input message piped in through stdin")
 
             connection = StdioConnection()
-            connection.consume(args[0], config=config, storage=LocalStorage(), secrets=LocalSecrets(), logger=logger)
+            connection.consume(args[0], config=config, storage=self.storage, secrets=self.secrets, logger=logger)
 
         except Exception as err:
             print(f"*** {err}")
@@ -55,3 +75,40 @@ class HypergoCli:
     def graph(self, keys: List[str], *args: str) -> int:
         hypergraph(keys, list(args))
         return 0
+
+    @staticmethod
+    def samples(paths: Iterable[str]) -> Generator[bytes, None, None]:
+        """Sample messages from files, or stored blobs under directories, as the compression operation sees them.
+
+        A file holding a JSON list contributes each of its elements.
+        """
+        for path in paths:
+            for file_name in HypergoCli._sample_files(path):
+                yield from HypergoCli._file_samples(file_name)
+
+    @staticmethod
+    def _sample_files(path: str) -> List[str]:
+        """path itself, or the stored blobs under it if it is a directory."""
+        if not os.path.isdir(path):
+            return [path]
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names if is_blob(name))
+
+    @staticmethod
+    def _file_samples(file_name: str) -> Generator[bytes, None, None]:
+        with open(file_name, "r", encoding="utf-8") as file:
+            content: str = file.read()
+        try:
+            loaded = json.loads(content)
+        except ValueError:
+            yield content.encode("utf-8")
+            return
+        for sample in loaded if isinstance(loaded, list) else [loaded]:
+            yield json.dumps(sample).encode("utf-8")
+
+    def dictionary(self, *paths: str, size: int = codecs.DICTIONARY_SIZE) -> int:
+        zdict: bytes = codecs.train_dictionary(HypergoCli.samples(paths), size)
+        if not zdict:
+            raise ValueError(f"No fragments shared by the samples in {list(paths)}")
+        dictionary_id: str = codecs.Dictionaries(self.storage.use_sub_path("dictionaries")).save(zdict)
+        print(f"{dictionary_id} ({len(zdict)} bytes)")
+        return 0
@@ -4,6 +4,7 @@ from typing import List, Tuple
 import click
 from click_default_group import DefaultGroup
 
+from hypergo import codecs
 from hypergo.hypergo_cli import HypergoCli
 from hypergo.hypergo_cmd import HypergoCmd
 
@@ -45,3 +46,11 @@ def stdio(ref: str, arg: Tuple[str, ...], stdin: bool) -> int:
 )
 def graph(keys: List[str], ref: str, arg: Tuple[str]) -> int:
     return HYPERGO_CLI.graph(keys, ref, *list(arg))
+
+
+@main.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--size', '-s', default=codecs.DICTIONARY_SIZE, type=click.INT, help='Maximum dictionary size in bytes.')
+def dictionary(paths: Tuple[str, ...], size: int) -> int:
+    """Train a compression dictionary from sample messages and save it to local storage."""
+    return HYPERGO_CLI.dictionary(*paths, size=size)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import time
+from functools import partial
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from hypergo.storage import Storage
+from hypergo.utility import Utility
+
+JOIN_PREFIX: str = "join_"
+REGISTRY_PREFIX: str = "joins_pending_"
+# seconds an incomplete join waits for its remaining inputs
+DEFAULT_TTL: float = 3600.0
+DEFAULT_MAX_PENDING: int = 10000
+DEFAULT_MAX_BYTES: int = 1024 * 1024 * 1024
+DEFAULT_SHARDS: int = 64
+
+
+class JoinOptions(NamedTuple):
+    """How long a join waits for its inputs and how much pending joins may hold, split between the shards."""
+
+    ttl: float = DEFAULT_TTL
+    max_pending: int = DEFAULT_MAX_PENDING
+    max_bytes: int = DEFAULT_MAX_BYTES
+    shards: int = DEFAULT_SHARDS
+
+
+class Arrival(NamedTuple):
+    """One input of a join: the index of its input key, as text, and where and how big its payload is."""
+
+    slot: str
+    payload_key: str
+    size: int
+    now: float
+
+
+class JoinStore:
+    """Partial fan-in joins, kept out of the transaction.
+
+    A join is a small record under join_<id>: the name and size of the payload
+    each arrived input key holds, and an expiry time. Payloads are stored
+    separately, each arrival under a name of its own, so an arrival only
+    rewrites the record (with compare-and-swap); the payloads are read once,
+    by the arrival that completes the join. A payload the record does not
+    take, because its join already completed, or no longer names, because a
+    redelivered input or a new join replaced it, is deleted by its arrival.
+
+    Every join is registered, with its expiry and the bytes it holds, in one of
+    shards joins_pending_<n> registries chosen by its id, so an arrival only
+    rewrites its own shard. Expired joins are purged whenever a shard is
+    updated, and joins closest to expiry are dropped early to keep each shard
+    within its share of max_pending joins and max_bytes. A completed join
+    keeps only its record, marked done, until it expires, so redelivered
+    inputs are ignored rather than starting a new join.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        input_keys: List[str],
+        options: JoinOptions = JoinOptions(),
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._storage: Storage = storage
+        self._input_keys: List[str] = input_keys
+        self._tokens: List[FrozenSet[str]] = [frozenset(input_key.split(".")) for input_key in input_keys]
+        self._options: JoinOptions = options
+        self._clock: Callable[[], float] = clock
+
+    def index(self, routingkey: str) -> Optional[int]:
+        """The input key routingkey arrives for: itself if listed, else the most specific one it matches."""
+        if routingkey in self._input_keys:
+            return self._input_keys.index(routingkey)
+        tokens: FrozenSet[str] = frozenset(routingkey.split("."))
+        matches: List[Tuple[int, int]] = [
+            (len(input_tokens), index) for index, input_tokens in enumerate(self._tokens) if input_tokens <= tokens
+        ]
+        return max(matches)[1] if matches else None
+
+    @staticmethod
+    def join_key(join_id: str) -> str:
+        return f"{JOIN_PREFIX}{join_id}"
+
+    @staticmethod
+    def payload_key(join_id: str, index: int) -> str:
+        """A new name for a payload arriving for input index of the join."""
+        return f"{JOIN_PREFIX}{join_id}_{index}_{Utility.unique_identifier()}"
+
+    def registry_key(self, join_id: str) -> str:
+        shard: int = int(hashlib.md5(join_id.encode("utf-8")).hexdigest()[:8], 16) % self._options.shards
+        return f"{REGISTRY_PREFIX}{shard}"
+
+    def arrive(self, join_id: str, routingkey: str, payload: Any) -> Optional[Dict[str, Any]]:
+        """Record payload for the join; the payload of every input key once this completes it, else None."""
+        index: Optional[int] = self.index(routingkey)
+        if index is None:
+            return None
+        content: str = json.dumps(Utility.serialize_value(payload))
+        arrival: Arrival = Arrival(str(index), JoinStore.payload_key(join_id, index), len(content), self._clock())
+        # saved before the record names it, so the arrival that completes the join finds every payload
+        self._storage.save(arrival.payload_key, content)
+        replaced: List[str] = []
+        record: str = self._storage.update(JoinStore.join_key(join_id), partial(self._add, arrival, replaced))
+        join: Dict[str, Any] = json.loads(record)
+        if join["payloads"].get(arrival.slot) != arrival.payload_key:
+            # a duplicate of an input of a join that already completed
+            self._storage.delete(arrival.payload_key)
+            return None
+        self._delete(replaced)
+        if not join["done"]:
+            self._track(join_id, join["expires"], len(record) + sum(join["sizes"].values()))
+            return None
+        return self._collect(join_id, join, len(record))
+
+    def _current(self, record: Optional[str], now: float) -> Tuple[Dict[str, Any], List[str]]:
+        """The join in record, or a new one if there is none or it expired, and the payloads the latter drops."""
+        join: Optional[Dict[str, Any]] = json.loads(record) if record else None
+        if join is None or join["expires"] <= now:
+            stale: List[str] = list(join["payloads"].values()) if join else []
+            return {"payloads": {}, "sizes": {}, "expires": now + self._options.ttl, "done": False}, stale
+        return join, []
+
+    def _add(self, arrival: Arrival, replaced: List[str], record: Optional[str]) -> str:
+        """record with arrival added to its join, noting in replaced the payloads it no longer names."""
+        join, stale = self._current(record, arrival.now)
+        replaced[:] = stale
+        if join["done"]:
+            return json.dumps(join)
+        previous: Optional[str] = join["payloads"].get(arrival.slot)
+        replaced.extend([previous] if previous else [])
+        join["payloads"][arrival.slot] = arrival.payload_key
+        join["sizes"][arrival.slot] = arrival.size
+        join["done"] = len(join["payloads"]) == len(self._input_keys)
+        return json.dumps(join)
+
+    def _collect(self, join_id: str, join: Dict[str, Any], record_size: int) -> Dict[str, Any]:
+        """The payload of every input key of the completed join, deleted once read."""
+        result: Dict[str, Any] = {
+            input_key: Utility.deserialize_value(json.loads(self._storage.load(join["payloads"][str(index)])))
+            for index, input_key in enumerate(self._input_keys)
+        }
+        self._delete(join["payloads"].values())
+        self._track(join_id, join["expires"], record_size)
+        return result
+
+    def _delete(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._storage.delete(name)
+
+    def _discard(self, join_id: str) -> None:
+        record, _ = self._storage.load_versioned(JoinStore.join_key(join_id))
+        if record:
+            self._delete(json.loads(record)["payloads"].values())
+        self._storage.delete(JoinStore.join_key(join_id))
+
+    def _track(self, join_id: str, expires: float, size: int) -> None:
+        """Register join_id in its shard until expires, purge the shard's expired joins and enforce its caps."""
+        now: float = self._clock()
+        # each shard enforces its share of the caps
+        max_pending: int = -(-self._options.max_pending // self._options.shards)
+        max_bytes: int = -(-self._options.max_bytes // self._options.shards)
+        dropped: List[str] = []
+
+        def register(record: Optional[str]) -> str:
+            joins: Dict[str, List[float]] = json.loads(record) if record else {}
+            joins[join_id] = [expires, size]
+            dropped.clear()
+            dropped.extend(other for other, (other_expires, _) in joins.items() if other_expires <= now)
+            for other in dropped:
+                del joins[other]
+            total: float = sum(other_size for _, other_size in joins.values())
+            for other in sorted(joins, key=lambda o: joins[o][0]):
+                if len(joins) <= max_pending and total <= max_bytes:
+                    break
+                total -= joins.pop(other)[1]
+                dropped.append(other)
+            return json.dumps(joins)
+
+        self._storage.update(self.registry_key(join_id), register)
+        for other in dropped:
+            self._discard(other)
+
+    def pending(self) -> Dict[str, Tuple[float, int]]:
+        """Expiry and bytes held of each incomplete join; reads every registered join, so meant for inspection."""
+        now: float = self._clock()
+        result: Dict[str, Tuple[float, int]] = {}
+        for shard in range(self._options.shards):
+            result.update(self._pending_in(f"{REGISTRY_PREFIX}{shard}", now))
+        return result
+
+    def _pending_in(self, registry_key: str, now: float) -> Dict[str, Tuple[float, int]]:
+        content, _ = self._storage.load_versioned(registry_key)
+        joins: Dict[str, List[Any]] = json.loads(content) if content else {}
+        return {
+            join_id: (expires, size)
+            for join_id, (expires, size) in joins.items()
+            if expires > now and self._incomplete(join_id)
+        }
+
+    def _incomplete(self, join_id: str) -> bool:
+        record, _ = self._storage.load_versioned(JoinStore.join_key(join_id))
+        return record is not None and not json.loads(record)["done"]
@@ -0,0 +1,109 @@
+import base64
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple, Type
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from hypergo.secrets import Secrets
+
+ENCRYPTIONKEY = "KRAgZMBXbP1OQQEJPvMTa6nfkVq63sgL2ULJIaMgfLA="
+
+
+class Cipher(ABC):
+    def __init__(self, key: str) -> None:
+        self._key: str = key
+
+    @abstractmethod
+    def encrypt(self, plaintext: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        pass
+
+
+class FernetCipher(Cipher):
+    """Fernet (AES-CBC + HMAC) over the raw token bytes, without its base64 text encoding."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(key)
+        self._fernet: Fernet = Fernet(key.encode("utf-8"))
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        return base64.urlsafe_b64decode(self._fernet.encrypt(plaintext))
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        return self._fernet.decrypt(base64.urlsafe_b64encode(ciphertext))
+
+
+class AesGcmCipher(Cipher):
+    """AES-GCM with a random 96-bit nonce prepended to the ciphertext."""
+
+    NONCE_SIZE: int = 12
+
+    def __init__(self, key: str) -> None:
+        super().__init__(key)
+        self._aesgcm: AESGCM = AESGCM(base64.urlsafe_b64decode(key.encode("utf-8")))
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        nonce: bytes = os.urandom(AesGcmCipher.NONCE_SIZE)
+        return nonce + self._aesgcm.encrypt(nonce, plaintext, None)
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        view: memoryview = memoryview(ciphertext)
+        return self._aesgcm.decrypt(bytes(view[: AesGcmCipher.NONCE_SIZE]), bytes(view[AesGcmCipher.NONCE_SIZE:]), None)
+
+
+CIPHERS: Dict[str, Type[Cipher]] = {"fernet": FernetCipher, "aesgcm": AesGcmCipher}
+
+
+class KeyRing:
+    """Encryption keys by id, resolved through Secrets (None is the built-in key), and ciphers cached per key id."""
+
+    # Secrets.get is a classmethod, so secrets of the same type resolve the same keys
+    _instances: Dict[type, "KeyRing"] = {}
+    _instances_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, secrets: Optional[Secrets] = None, default_key: str = ENCRYPTIONKEY) -> None:
+        self._secrets: Optional[Secrets] = secrets
+        self._default_key: str = default_key
+        self._ciphers: Dict[Tuple[str, Optional[str]], Cipher] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def for_secrets(secrets: Optional[Secrets]) -> "KeyRing":
+        """The key ring over secrets, shared by everything using secrets of the same type."""
+        with KeyRing._instances_lock:
+            keyring: Optional[KeyRing] = KeyRing._instances.get(type(secrets))
+            if keyring is None:
+                keyring = KeyRing._instances[type(secrets)] = KeyRing(secrets)
+            return keyring
+
+    def key(self, key_id: Optional[str]) -> str:
+        if key_id is None:
+            return self._default_key
+        if self._secrets is None:
+            raise ValueError(f"Resolving encryption key '{key_id}' requires secrets")
+        return str(self._secrets.get(key_id))
+
+    def cipher(self, name: str, key_id: Optional[str] = None) -> Cipher:
+        cipher: Optional[Cipher] = self._ciphers.get((name, key_id))
+        if cipher is None:
+            try:
+                cipher_type: Type[Cipher] = CIPHERS[name]
+            except KeyError as error:
+                raise ValueError(f"Unknown cipher '{name}'; available: {sorted(CIPHERS)}") from error
+            cipher = cipher_type(self.key(key_id))
+            with self._lock:
+                self._ciphers[(name, key_id)] = cipher
+        return cipher
+
+    @staticmethod
+    def generate_key(name: str = "aesgcm") -> str:
+        """A new random key for cipher name, in the form stored as a secret."""
+        if name == "fernet":
+            return Fernet.generate_key().decode("utf-8")
+        return base64.urlsafe_b64encode(AESGCM.generate_key(bit_length=256)).decode("utf-8")
@@ -1,29 +1,170 @@
+import hashlib
+import mmap
 import os
+import threading
+from contextlib import contextmanager, suppress
 from functools import wraps
-from typing import Any, Callable
+from typing import IO, Any, Callable, Iterator, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
 
 from hypergo.storage import Storage
-from hypergo.utility import Utility
+
+ROOT_VARIABLE: str = "HYPERGO_STORAGE_ROOT"
+
+
+def default_root() -> str:
+    return os.environ.get(ROOT_VARIABLE) or os.path.join(os.path.expanduser("~"), ".hypergo_storage")
 
 
 def addsubfolder(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Call func with the sharded path file_name is written to."""
+
     @wraps(func)
-    def wrapper(self: Any, file_name: str, *args: Any) -> Any:
-        return func(self, os.path.join(os.path.expanduser("~"), ".hypergo_storage", file_name), *args)
+    def wrapper(self: "LocalStorage", file_name: str, *args: Any) -> Any:
+        return func(self, self.path(file_name), *args)
+
+    return wrapper
+
+
+def existingfile(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Call func with the path file_name was written to, falling back to the flat layout."""
+
+    @wraps(func)
+    def wrapper(self: "LocalStorage", file_name: str, *args: Any) -> Any:
+        path: str = self.path(file_name)
+        if not os.path.isfile(path):
+            flat: str = self.flat_path(file_name)
+            if os.path.isfile(flat):
+                path = flat
+        return func(self, path, *args)
 
     return wrapper
 
 
 class LocalStorage(Storage):
-    @addsubfolder
+    """Files under root: $HYPERGO_STORAGE_ROOT, else ~/.hypergo_storage.
+
+    A file named sub/path/name is kept at root/sub/path/ab/cd/name, where abcd
+    starts the md5 of name, so no directory grows past a few thousand entries.
+    Files written by earlier versions directly under root/sub/path are still
+    read. Saves write a temporary file and rename it over the target, so
+    readers, and files left by a crashed writer, are never partial.
+
+    The version of a file is the digest of its content, as for any Storage, and
+    save_if_version holds an flock on the file's directory, so compare-and-swap
+    is atomic across processes sharing root without files beside the data.
+    """
+
+    # directories known to exist, so saves skip os.makedirs
+    _directories: Set[str] = set()
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self._root: str = root or default_root()
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    @property
+    def storage_root(self) -> Optional[str]:
+        return self._root
+
+    def flat_path(self, file_name: str) -> str:
+        return os.path.join(self._root, file_name)
+
+    def path(self, file_name: str) -> str:
+        directory, name = os.path.split(file_name)
+        digest: str = hashlib.md5(name.encode("utf-8")).hexdigest()
+        return os.path.join(self._root, directory, digest[:2], digest[2:4], name)
+
+    @staticmethod
+    def _makedirs(directory: str) -> None:
+        if directory not in LocalStorage._directories:
+            os.makedirs(directory, exist_ok=True)
+            LocalStorage._directories.add(directory)
+
+    @staticmethod
+    def _open(path: str, mode: str) -> IO[Any]:
+        """open(path, mode), creating the directory if it is missing."""
+        try:
+            return open(path, mode)  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            # never created, or removed since it was cached
+            LocalStorage._directories.discard(os.path.dirname(path))
+        LocalStorage._makedirs(os.path.dirname(path))
+        return open(path, mode)  # pylint: disable=consider-using-with
+
+    @staticmethod
+    def _write(path: str, content: bytes) -> None:
+        temp_path: str = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with LocalStorage._open(temp_path, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    @contextmanager
+    def _locked(directory: str) -> Iterator[None]:
+        """An exclusive flock on directory, where flock is available."""
+        if fcntl is None:
+            yield
+            return
+        LocalStorage._makedirs(directory)
+        descriptor: int = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            # closing releases the lock
+            os.close(descriptor)
+
+    def delete(self, file_name: str) -> None:
+        for candidate in [self.path(file_name), self.flat_path(file_name)]:
+            with suppress(FileNotFoundError):
+                os.remove(candidate)
+
+    def save_if_version(self, file_name: str, content: str, version: Optional[str]) -> Optional[str]:
+        with LocalStorage._locked(os.path.dirname(self.path(file_name))):
+            return super().save_if_version(file_name, content, version)
+
+    @existingfile
     def load(self, file_name: str) -> str:
-        with open(file_name, "r", encoding="utf-8") as file:
-            content: str = file.read()
-        return content
+        with open(file_name, "rb") as file:
+            return file.read().decode("utf-8")
+
+    @existingfile
+    def load_bytes(self, file_name: str) -> bytes:
+        with open(file_name, "rb") as file:
+            return file.read()
 
     @addsubfolder
-    def save(self, file_name: str, content: str) -> None:
-        Utility.create_folders_for_file(file_name)
+    def save_bytes(self, file_name: str, content: bytes) -> None:
+        LocalStorage._write(file_name, content)
+
+    @existingfile
+    def local_path(self, file_name: str) -> Optional[str]:
+        return file_name if os.path.isfile(file_name) else None
 
-        with open(file_name, "w", encoding="utf-8") as file:
-            file.write(content)
+    @existingfile
+    def load_range(self, file_name: str, start: int, end: int) -> str:
+        with open(file_name, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start:end].decode("utf-8")
+
+    @existingfile
+    def exists(self, file_name: str) -> bool:
+        return os.path.isfile(file_name)
+
+    @addsubfolder
+    def save(self, file_name: str, content: str) -> None:
+        LocalStorage._write(file_name, content.encode("utf-8"))
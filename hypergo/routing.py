@@ -0,0 +1,134 @@
+import operator
+import re
+from functools import lru_cache, reduce
+from itertools import chain
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+WILDCARD: Pattern[str] = re.compile(r"(?<=\.)\?(?=\.)|^\?|(?<=\.)\?$|^\?$")
+
+DEFAULT_MAXSIZE: int = 4096
+
+
+class TokenTable:
+    """Interns routing key tokens as bits, so a set of tokens is an integer mask."""
+
+    __slots__ = ("_bits", "_tokens")
+
+    def __init__(self) -> None:
+        self._bits: Dict[str, int] = {}
+        self._tokens: List[str] = []
+
+    def intern(self, tokens: List[str]) -> int:
+        mask: int = 0
+        for token in tokens:
+            if token not in self._bits:
+                self._bits[token] = 1 << len(self._tokens)
+                self._tokens.append(token)
+            mask |= self._bits[token]
+        return mask
+
+    def split(self, routing_key: str) -> Tuple[int, Set[str]]:
+        """The mask of the known tokens of routing_key, and its unknown tokens."""
+        mask: int = 0
+        unknown: Set[str] = set()
+        for token in routing_key.split("."):
+            bit: Optional[int] = self._bits.get(token)
+            if bit is None:
+                unknown.add(token)
+            else:
+                mask |= bit
+        return mask, unknown
+
+    def tokens(self, mask: int) -> List[str]:
+        return [token for token in self._tokens if self._bits[token] & mask]
+
+
+class OutputTemplate(NamedTuple):
+    """Output keys compiled once.
+
+    Output keys whose "?" placeholders are whole tokens reduce to a static token
+    set plus "the derived tokens go here"; anything else is rendered by regex.
+    """
+
+    static: FrozenSet[str]
+    wildcard: bool
+    rendered: Tuple[str, ...]
+    empty: bool
+
+    @staticmethod
+    def compile(output_keys: List[str]) -> "OutputTemplate":
+        tokens: FrozenSet[str] = frozenset(
+            chain.from_iterable(output_key.split(".") for output_key in output_keys if not _rendered(output_key))
+        )
+        return OutputTemplate(tokens - {"?"}, "?" in tokens, tuple(filter(_rendered, output_keys)), not output_keys)
+
+    def render(self, token: str) -> str:
+        """The output routing key for the derived tokens token."""
+        tokens: Set[str] = set(self.static)
+        if self.wildcard:
+            tokens.update(token.split("."))
+        for output_key in self.rendered:
+            tokens.update(WILDCARD.sub(token, output_key).split("."))
+        if self.empty:
+            tokens.add("")
+        return ".".join(sorted(tokens))
+
+
+def _rendered(output_key: str) -> bool:
+    """Whether output_key starts with a "?" that is part of a longer token."""
+    return output_key.startswith("?") and output_key.split(".")[0] != "?"
+
+
+class RoutingKeyEngine:
+    """Derives output routing keys from input routing keys for one component.
+
+    input_keys are interned into token bitsets once, so matching a routing key
+    is a couple of integer operations per input key, and the result for each
+    distinct input routing key is memoized in an LRU cache.
+    """
+
+    def __init__(self, input_keys: List[str], output_keys: List[str], maxsize: Optional[int] = DEFAULT_MAXSIZE) -> None:
+        self._input_keys: List[str] = input_keys
+        self._output_keys: List[str] = output_keys
+        self._table: TokenTable = TokenTable()
+        self._input_masks: List[int] = [self._table.intern(input_key.split(".")) for input_key in input_keys]
+        self._output: OutputTemplate = OutputTemplate.compile(output_keys)
+        self.output_routing_key = lru_cache(maxsize=maxsize)(self._output_routing_key)
+
+    @property
+    def input_keys(self) -> List[str]:
+        return self._input_keys
+
+    @property
+    def output_keys(self) -> List[str]:
+        return self._output_keys
+
+    def derived_tokens(self, input_routing_key: str) -> str:
+        """Tokens of the routing key not captured by the input keys it matches, sorted and dot-joined."""
+        mask, tokens = self._table.split(input_routing_key)
+        matching: List[int] = [input_mask for input_mask in self._input_masks if input_mask & mask == input_mask]
+        if not matching:
+            return ""
+        if RoutingKeyEngine._exhausted(mask, tokens, matching):
+            tokens.add("")
+        tokens.update(self._table.tokens(mask & ~reduce(operator.and_, matching)))
+        return ".".join(sorted(tokens))
+
+    @staticmethod
+    def _exhausted(mask: int, unknown: Set[str], matching: List[int]) -> bool:
+        """Whether some matching input key captures every token of the routing key."""
+        return not unknown and any(mask & ~input_mask == 0 for input_mask in matching)
+
+    def _output_routing_key(self, input_routing_key: str) -> str:
+        return self._output.render(self.derived_tokens(input_routing_key))
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        info = self.output_routing_key.cache_info()
+        lookups: int = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
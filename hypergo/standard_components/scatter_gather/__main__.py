@@ -0,0 +1,59 @@
+from itertools import islice
+from typing import Any, Generator, Iterable, Iterator, Optional
+from hypergo.executor import Executor
+from hypergo.transaction import Transaction
+
+__all__ = ["scatter", "gather"]
+
+
+def shards(body: Iterable[Any], shard_size: int = 1) -> Generator[Any, None, None]:
+    """body split into lists of shard_size items, or single items for a shard_size of 1."""
+    items: Iterator[Any] = iter(body)
+    while True:
+        shard = list(islice(items, shard_size))
+        if not shard:
+            return
+        yield shard[0] if shard_size == 1 else shard
+
+
+def scatter(
+    body: Any, transaction: Transaction, shard_size: int = 1, splitter: Optional[str] = None
+) -> Generator[Any, None, None]:
+    """Yield body as shards, one message each, in a new child frame of the transaction.
+
+    splitter is the dotted name of a generator function that yields the shards of
+    body; by default body is split into shard_size items. The number of shards
+    is recorded in the frame as "expected" before the last one is yielded, so it
+    is stored before any gather can have received every partial result.
+    """
+    transaction.push()
+    pieces: Iterable[Any] = Executor.func_spec(splitter)(body) if splitter else shards(body, shard_size)
+    count: int = 0
+    previous: Any = None
+    for piece in pieces:
+        if count:
+            yield previous
+        previous = piece
+        count += 1
+    if not count:
+        transaction.pop()
+        return
+    transaction.set("expected", count)
+    yield previous
+
+
+def gather(partial: Any, transaction: Transaction, reducer: str = "operator.add") -> Any:
+    """Reduce the partial results of a scatter as they arrive; the result once all have.
+
+    Each partial is folded into the frame's "result" with reducer (the dotted
+    name of a function of two arguments, applied in arrival order) and stored
+    straight away, so only the running result is kept. The arrival that brings
+    the count up to "expected" pops the frame and returns the result; every other
+    one returns None.
+    """
+    transaction.reduce("result", partial, reducer)
+    transaction.reduce("received", 1)
+    transaction.commit()
+    if transaction.get("received") != transaction.get("expected"):
+        return None
+    return transaction.pop().get("result")
@@ -1,12 +1,16 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
+from hypergo.join_store import JoinOptions, JoinStore
+from hypergo.storage import Storage
 from hypergo.transaction import Transaction
 
-__all__ = ["converge"]
+__all__ = ["converge", "join"]
 
 
 def converge(input_keys: List[str], routingkey: str, payload: Any, transaction: Transaction) -> Dict[str, Any]:
     merged_data = {}
     transaction.set(routingkey, payload)
+    # store the payload before deciding, so of two branches arriving together the later one sees both
+    transaction.commit()
     for rk in input_keys:
         merged_data[rk] = transaction.get(rk, None)
         if not merged_data[rk]:
@@ -14,6 +18,23 @@ def converge(input_keys: List[str], routingkey: str, payload: Any, transaction:
     return merged_data
 
 
+def join(
+    input_keys: Union[List[str], Dict[str, Any]],
+    routingkey: str,
+    payload: Any,
+    transaction: Transaction,
+    storage: Storage,
+) -> Optional[Dict[str, Any]]:
+    """converge, with the partial join kept in a JoinStore instead of the transaction.
+
+    Bind storage to "{storage}". input_keys is either the list of input keys or a mapping holding
+    them under "input_keys" along with any JoinOptions, e.g. bound to "{config.custom_properties.join}".
+    """
+    spec: Dict[str, Any] = dict(input_keys) if isinstance(input_keys, dict) else {"input_keys": input_keys}
+    keys: List[str] = spec.pop("input_keys")
+    return JoinStore(storage, keys, JoinOptions(**spec)).arrive(transaction.txid, routingkey, payload)
+
+
 if __name__ == "__main__":
     tx = Transaction()
     result = None
@@ -1,8 +1,24 @@
+import base64
+import hashlib
 import os
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from typing import Callable, Optional, Tuple
+
+DEFAULT_ATTEMPTS: int = 10
+# seconds; the n-th retry waits up to BACKOFF * 2 ** n
+BACKOFF: float = 0.005
+
+
+class VersionConflictError(RuntimeError):
+    pass
 
 
 class Storage(ABC):
+    _versioned_lock: threading.RLock = threading.RLock()
+
     @abstractmethod
     def load(self, file_name: str) -> str:
         pass
@@ -11,6 +27,76 @@ class Storage(ABC):
     def save(self, file_name: str, content: str) -> None:
         pass
 
+    def load_bytes(self, file_name: str) -> bytes:
+        return base64.b64decode(self.load(file_name))
+
+    def save_bytes(self, file_name: str, content: bytes) -> None:
+        """Save binary content; storages that only hold text keep it base64-encoded."""
+        self.save(file_name, base64.b64encode(content).decode("ascii"))
+
+    def local_path(self, file_name: str) -> Optional[str]:
+        """A local file holding the raw bytes saved under file_name, if the storage has one."""
+        return None
+
+    @property
+    def storage_root(self) -> Optional[str]:
+        """Where the files are kept, the same for every storage over them; None when the storage cannot tell."""
+        return None
+
+    def load_range(self, file_name: str, start: int, end: int) -> str:
+        """Characters start to end of an ASCII file; storages that can should avoid reading the rest."""
+        return self.load(file_name)[start:end]
+
+    def exists(self, file_name: str) -> bool:
+        try:
+            self.load(file_name)
+        except (FileNotFoundError, KeyError):
+            return False
+        return True
+
+    def delete(self, file_name: str) -> None:
+        """Remove file_name if it exists; storages that cannot delete keep it."""
+
+    def load_versioned(self, file_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """The content of file_name and a version for save_if_version; (None, None) if there is no such file.
+
+        The default version is a digest of the content and is only checked
+        atomically within this process; storages shared between processes should
+        override this and save_if_version.
+        """
+        try:
+            content: str = self.load(file_name)
+        except (FileNotFoundError, KeyError):
+            return None, None
+        return content, hashlib.md5(content.encode("utf-8")).hexdigest()
+
+    def save_if_version(self, file_name: str, content: str, version: Optional[str]) -> Optional[str]:
+        """Save content only if file_name is still at version (None: does not exist yet).
+
+        Returns the new version, or None when another writer got there first.
+        """
+        with Storage._versioned_lock:
+            if self.load_versioned(file_name)[1] != version:
+                return None
+            self.save(file_name, content)
+            return self.load_versioned(file_name)[1]
+
+    def update(
+        self, file_name: str, func: Callable[[Optional[str]], str], attempts: int = DEFAULT_ATTEMPTS
+    ) -> str:
+        """Replace the content of file_name with func(content) using compare-and-swap.
+
+        func is called again with the fresh content whenever another writer
+        changed the file in between, after a short randomized backoff.
+        """
+        for attempt in range(attempts):
+            content, version = self.load_versioned(file_name)
+            new_content: str = func(content)
+            if self.save_if_version(file_name, new_content, version) is not None:
+                return new_content
+            time.sleep(random.uniform(0, BACKOFF * 2**attempt))
+        raise VersionConflictError(f"{file_name} kept changing; gave up after {attempts} attempts")
+
     def use_sub_path(self, sub_path: str) -> "Storage":
         return SubStorage(self, sub_path)
 
@@ -20,8 +106,37 @@ class SubStorage(Storage):
         self._base_storage: Storage = base_storage
         self._sub_path: str = sub_path
 
+    @property
+    def storage_root(self) -> Optional[str]:
+        base_root: Optional[str] = self._base_storage.storage_root
+        return None if base_root is None else os.path.join(base_root, self._sub_path)
+
     def load(self, file_name: str) -> str:
         return self._base_storage.load(os.path.join(self._sub_path, file_name))
 
     def save(self, file_name: str, content: str) -> None:
         return self._base_storage.save(os.path.join(self._sub_path, file_name), content)
+
+    def load_bytes(self, file_name: str) -> bytes:
+        return self._base_storage.load_bytes(os.path.join(self._sub_path, file_name))
+
+    def save_bytes(self, file_name: str, content: bytes) -> None:
+        return self._base_storage.save_bytes(os.path.join(self._sub_path, file_name), content)
+
+    def local_path(self, file_name: str) -> Optional[str]:
+        return self._base_storage.local_path(os.path.join(self._sub_path, file_name))
+
+    def load_range(self, file_name: str, start: int, end: int) -> str:
+        return self._base_storage.load_range(os.path.join(self._sub_path, file_name), start, end)
+
+    def exists(self, file_name: str) -> bool:
+        return self._base_storage.exists(os.path.join(self._sub_path, file_name))
+
+    def delete(self, file_name: str) -> None:
+        return self._base_storage.delete(os.path.join(self._sub_path, file_name))
+
+    def load_versioned(self, file_name: str) -> Tuple[Optional[str], Optional[str]]:
+        return self._base_storage.load_versioned(os.path.join(self._sub_path, file_name))
+
+    def save_if_version(self, file_name: str, content: str, version: Optional[str]) -> Optional[str]:
+        return self._base_storage.save_if_version(os.path.join(self._sub_path, file_name), content, version)
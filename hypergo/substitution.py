@@ -0,0 +1,391 @@
+import operator
+import re
+import threading
+import weakref
+from collections import Counter
+from itertools import chain
+from typing import (Any, Callable, Dict, Iterable, List, Match, Optional,
+                    Pattern, Set, Tuple)
+
+from hypergo.traversal import CONTAINER_TYPES
+from hypergo.utility import Utility, traverse_datastructures
+
+WHOLE_TEMPLATE: Pattern[str] = re.compile(r"^{([^}]+)}$")
+EMBEDDED_TEMPLATE: Pattern[str] = re.compile(r"{([^}]+)}")
+MESSAGE_TEMPLATE: Pattern[str] = re.compile(r"^.*\{message\.[^\}]+\}.*$")
+
+CompiledBinding = Callable[[Dict[str, Any]], Any]
+
+
+def find_best_key(keys: Iterable[str], routingkey: str) -> str:
+    rk_set: Set[str] = set(routingkey.split("."))
+    matched_key: str = ""
+    maxlen: int = 0
+    for key in keys:
+        key_set: Set[str] = set(key.split("."))
+        if key_set.intersection(rk_set) == key_set and len(key_set) > maxlen:
+            maxlen = len(key_set)
+            matched_key = key
+    return matched_key
+
+
+class KeyIndex:
+    """Inverted token index over a fixed set of keys, for "?" wildcard lookups.
+
+    best_key() returns the same key as find_best_key(): the key with the most
+    tokens whose tokens are all in the routing key, the earliest such key
+    winning ties.
+    """
+
+    MAX_REMEMBERED: int = 1024
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self._rank: Dict[str, Tuple[int, int]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._best: Dict[str, str] = {}
+        for order, key in enumerate(keys):
+            tokens: Set[str] = set(key.split("."))
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(key)
+            # prefer the most specific key, then the one listed first
+            self._rank[key] = (len(tokens), -order)
+
+    def best_key(self, routingkey: str) -> str:
+        best: Optional[str] = self._best.get(routingkey)
+        if best is None:
+            if len(self._best) >= KeyIndex.MAX_REMEMBERED:
+                self._best.clear()
+            best = self._best[routingkey] = self._find(routingkey)
+        return best
+
+    def _find(self, routingkey: str) -> str:
+        hits: Counter[str] = Counter(
+            chain.from_iterable(self._postings.get(token, ()) for token in set(routingkey.split(".")))
+        )
+        matches: List[str] = [key for key, count in hits.items() if count == self._rank[key][0]]
+        return max(matches, key=self._rank.__getitem__, default="")
+
+
+class KeyIndexCache:
+    """KeyIndexes of the dicts of configs, which are never mutated, matched by identity.
+
+    Dicts are indexed while the ConfigTemplate holding them lives, so an
+    indexed dict cannot be freed and its id reused. Any other dict, such as a
+    message body, is scanned: it is seen by one message only, and keeping it
+    to index would pin it in memory.
+    """
+
+    MIN_KEYS: int = 8
+
+    def __init__(self) -> None:
+        self._indexes: Dict[int, KeyIndex] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def register(self, owner: Any, value: Any) -> None:
+        """Index the dicts in value, until owner, which must keep value alive, is collected."""
+        nodes: Dict[int, Dict[str, Any]] = {}
+        KeyIndexCache._collect(value, nodes)
+        with self._lock:
+            self._indexes.update((node_id, KeyIndex(node)) for node_id, node in nodes.items())
+        weakref.finalize(owner, self._unregister, list(nodes))
+
+    @staticmethod
+    def _collect(value: Any, nodes: Dict[int, Dict[str, Any]]) -> None:
+        if KeyIndexCache._indexable(value):
+            nodes[id(value)] = value
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, list):
+            return
+        for child in value:
+            KeyIndexCache._collect(child, nodes)
+
+    @staticmethod
+    def _indexable(value: Any) -> bool:
+        if not isinstance(value, dict) or len(value) < KeyIndexCache.MIN_KEYS:
+            return False
+        return all(isinstance(key, str) for key in value)
+
+    def _unregister(self, node_ids: List[int]) -> None:
+        with self._lock:
+            for node_id in node_ids:
+                self._indexes.pop(node_id, None)
+
+    def best_key(self, node: Any, routingkey: str) -> str:
+        index: Optional[KeyIndex] = self._indexes.get(id(node)) if isinstance(node, dict) else None
+        return find_best_key(node, routingkey) if index is None else index.best_key(routingkey)
+
+
+KEY_INDEXES: KeyIndexCache = KeyIndexCache()
+
+
+def do_question_mark(context: Dict[str, Any], input_string: Any) -> str:
+    node_path: List[str] = []
+    for node in input_string.split("."):
+        if node == "?":
+            routingkey: str = Utility.deep_get(context, "message.routingkey")
+            matched_key: str = KEY_INDEXES.best_key(Utility.deep_get(context, ".".join(node_path)), routingkey)
+            node_path.append(re.sub(r"\.", "\\.", matched_key))
+        else:
+            node_path.append(node)
+    return ".".join(node_path)
+
+
+def is_literal(node: Any) -> bool:
+    """Leaves substitution cannot change: anything but containers and strings with a "{"."""
+    if isinstance(node, str):
+        return "{" not in node
+    return type(node) not in CONTAINER_TYPES
+
+
+def _substitute_template(string: str, data: Dict[str, Any]) -> Any:
+    matched_regex: Optional[Match[str]] = WHOLE_TEMPLATE.match(string)
+    # version 2.0.0 and above
+    if matched_regex:
+        return Utility.deep_get(data, do_question_mark(data, matched_regex.group(1)), matched_regex.group(0))
+    # backward compatibility
+    return EMBEDDED_TEMPLATE.sub(
+        lambda match: str(Utility.deep_get(data, do_question_mark(data, match.group(1)), match.group(0))), string
+    )
+
+
+def do_substitution(value: Any, data: Dict[str, Any]) -> Any:
+    @traverse_datastructures(prune=is_literal)
+    def substitute(string: str, data: Dict[str, Any]) -> Any:
+        if not isinstance(string, str):
+            return string
+        result: Any = _substitute_template(string, data)
+        # We were substituting message.* in the string with the actual
+        # payload
+        if MESSAGE_TEMPLATE.match(string) or result == string:
+            return result
+        return substitute(result, data)
+
+    return substitute(value, data)
+
+
+def compile_path(path: str) -> Callable[[Dict[str, Any]], str]:
+    if "?" not in path.split("."):
+        return lambda data: path
+    return lambda data: do_question_mark(data, path)
+
+
+def _compile_dict(value: Dict[Any, Any]) -> CompiledBinding:
+    items = [(compile_binding(key), compile_binding(val)) for key, val in value.items()]
+    return lambda data: {key(data): val(data) for key, val in items}
+
+
+def _compile_list(value: List[Any]) -> CompiledBinding:
+    elements = [compile_binding(item) for item in value]
+    return lambda data: [element(data) for element in elements]
+
+
+def _compile_tuple(value: Tuple[Any, ...]) -> CompiledBinding:
+    members = [compile_binding(item) for item in value]
+    return lambda data: tuple(member(data) for member in members)
+
+
+CONTAINER_COMPILERS: List[Tuple[type, Callable[[Any], CompiledBinding]]] = [
+    (dict, _compile_dict),
+    (list, _compile_list),
+    (tuple, _compile_tuple),
+]
+
+
+def _finisher(template: str) -> Callable[[Any, Dict[str, Any]], Any]:
+    """Substitute a rendered template again, as do_substitution does, unless it held message fields or is unchanged."""
+    is_message: bool = bool(MESSAGE_TEMPLATE.match(template))
+
+    def finish(result: Any, data: Dict[str, Any]) -> Any:
+        if is_message or result == template:
+            return result
+        return do_substitution(result, data)
+
+    return finish
+
+
+def _compile_embedded(template: str, finish: Callable[[Any, Dict[str, Any]], Any]) -> CompiledBinding:
+    """Literal text with embedded {path} templates, rendered from precompiled pieces."""
+    pieces: List[str] = EMBEDDED_TEMPLATE.split(template)
+    literals: List[str] = pieces[0::2]
+    paths = [(compile_path(piece), f"{{{piece}}}") for piece in pieces[1::2]]
+
+    def render(data: Dict[str, Any]) -> Any:
+        rendered: List[str] = [literals[0]]
+        for (path, default), literal in zip(paths, literals[1:]):
+            rendered.append(str(Utility.deep_get(data, path(data), default)))
+            rendered.append(literal)
+        return finish("".join(rendered), data)
+
+    return render
+
+
+def _compile_template(template: str) -> CompiledBinding:
+    finish: Callable[[Any, Dict[str, Any]], Any] = _finisher(template)
+    matched: Optional[Match[str]] = WHOLE_TEMPLATE.match(template)
+    if not matched:
+        # backward compatibility
+        return _compile_embedded(template, finish)
+    path: Callable[[Dict[str, Any]], str] = compile_path(matched.group(1))
+    return lambda data: finish(Utility.deep_get(data, path(data), template), data)
+
+
+def compile_binding(value: Any) -> CompiledBinding:
+    """Parse a binding once into a function of the per-message data.
+
+    The compiled binding gives the same result as do_substitution(value, data):
+    literals are returned as-is, "{path}" becomes a single lookup, "?" paths
+    resolve their wildcard against the routing key and embedded templates are
+    rendered from precompiled pieces. Values that resolve to further templates
+    are still substituted recursively.
+    """
+    for kind, compiler in CONTAINER_COMPILERS:
+        if isinstance(value, kind):
+            return compiler(value)
+    if not isinstance(value, str) or "{" not in value:
+        return lambda data: value
+    return _compile_template(value)
+
+
+class BindingPlan:
+    """Input bindings compiled once per config and applied to every message."""
+
+    def __init__(self, input_bindings: List[Any], arg_spec: List[type]) -> None:
+        self._source: List[Any] = input_bindings
+        self._arg_spec: List[type] = arg_spec
+        self._steps = [
+            (compile_binding(binding), Utility.safecaster(argtype))
+            for binding, argtype in zip(input_bindings, arg_spec)
+        ]
+
+    @property
+    def source(self) -> List[Any]:
+        return self._source
+
+    @property
+    def arg_spec(self) -> List[type]:
+        return self._arg_spec
+
+    def for_bindings(self, input_bindings: List[Any]) -> "BindingPlan":
+        """This plan if input_bindings are its source, otherwise a plan for them with the same argument types."""
+        return self if input_bindings is self._source else BindingPlan(input_bindings, self._arg_spec)
+
+    def apply(self, context: Dict[str, Any]) -> List[Any]:
+        return [convert(binding(context)) for binding, convert in self._steps]
+
+
+def has_template(value: Any) -> bool:
+    if isinstance(value, str):
+        return bool(EMBEDDED_TEMPLATE.search(value))
+    if isinstance(value, dict):
+        return any(map(has_template, chain.from_iterable(value.items())))
+    if isinstance(value, (list, tuple)):
+        return any(map(has_template, value))
+    return False
+
+
+def _writable(container: Any, copied: Set[int]) -> Any:
+    """A copy of container, unless it is itself one of the copies in copied."""
+    if id(container) in copied:
+        return container
+    container = dict(container) if isinstance(container, dict) else list(container)
+    copied.add(id(container))
+    return container
+
+
+class ConfigTemplate:
+    """Copy-on-write view of a config for per-message substitution.
+
+    Templates that only reference the config itself are resolved once here. The
+    remaining fields (those that depend on the message, the transaction, a "?"
+    wildcard or a template key) are recorded by path, and snapshot() evaluates
+    only those, copying just the containers on the way to them. Everything else
+    is shared with the original config, which is never mutated.
+    """
+
+    EXCLUDED: List[str] = ["input_bindings"]
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self._source: Dict[str, Any] = config
+        self._dynamic: List[Tuple[Any, ...]] = []
+        self._static: Any = self._compile(config, (), {"config": config})
+        KEY_INDEXES.register(self, self._static)
+
+    @property
+    def source(self) -> Dict[str, Any]:
+        return self._source
+
+    @property
+    def resolved(self) -> Any:
+        """The config with its static templates resolved; dynamic fields still hold their templates."""
+        return self._static
+
+    @property
+    def dynamic_paths(self) -> List[Tuple[Any, ...]]:
+        return list(self._dynamic)
+
+    def _compile(self, value: Any, path: Tuple[Any, ...], static_data: Dict[str, Any]) -> Any:
+        if isinstance(value, dict):
+            return self._compile_dict(value, path, static_data)
+        if isinstance(value, list):
+            return self._compile_list(value, path, static_data)
+        return self._compile_leaf(value, path, static_data)
+
+    def _compile_list(self, value: List[Any], path: Tuple[Any, ...], static_data: Dict[str, Any]) -> Any:
+        elements: List[Any] = [self._compile(item, path + (index,), static_data) for index, item in enumerate(value)]
+        return value if all(map(operator.is_, elements, value)) else elements
+
+    def _compile_dict(self, value: Dict[Any, Any], path: Tuple[Any, ...], static_data: Dict[str, Any]) -> Any:
+        if any(map(has_template, value)):
+            self._dynamic.append(path)
+            return value
+        values: List[Any] = [self._compile_field(key, val, path, static_data) for key, val in value.items()]
+        return value if all(map(operator.is_, values, value.values())) else dict(zip(value, values))
+
+    def _compile_field(self, key: Any, value: Any, path: Tuple[Any, ...], static_data: Dict[str, Any]) -> Any:
+        # input_bindings are compiled into a BindingPlan instead
+        if not path and key in ConfigTemplate.EXCLUDED:
+            return value
+        return self._compile(value, path + (key,), static_data)
+
+    def _compile_leaf(self, value: Any, path: Tuple[Any, ...], static_data: Dict[str, Any]) -> Any:
+        if not has_template(value):
+            return value
+        try:
+            resolved: Any = do_substitution(value, static_data)
+        except (KeyError, TypeError, AttributeError):
+            resolved = value
+        if has_template(resolved):
+            self._dynamic.append(path)
+            return value
+        return resolved
+
+    def snapshot(self, data: Dict[str, Any], source: Optional[Any] = None) -> Any:
+        """Substitute the dynamic fields of source (the precompiled config by default) against data."""
+        config: Any = self._static if source is None else source
+        if not self._dynamic:
+            return config
+        if () in self._dynamic:
+            return ConfigTemplate._substitute_whole(config, data)
+        return self._substitute_dynamic(config, data)
+
+    @staticmethod
+    def _substitute_whole(config: Any, data: Dict[str, Any]) -> Any:
+        result: Any = do_substitution(config, data)
+        for key in [key for key in ConfigTemplate.EXCLUDED if key in config]:
+            result[key] = config[key]
+        return result
+
+    def _substitute_dynamic(self, config: Any, data: Dict[str, Any]) -> Any:
+        """config with only its dynamic fields substituted, copying just the containers on the way to them."""
+        copied: Set[int] = set()
+        root: Any = _writable(config, copied)
+        for path in self._dynamic:
+            node: Any = root
+            original: Any = config
+            for key in path[:-1]:
+                original = original[key]
+                node[key] = _writable(node[key], copied)
+                node = node[key]
+            node[path[-1]] = do_substitution(original[path[-1]], data)
+        return root
@@ -1,10 +1,190 @@
+import importlib
 import json
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 from hypergo.utility import Utility
 
+if TYPE_CHECKING:
+    from hypergo.transaction_log import TransactionLog
+
+
+class EncodedFrame:
+    """A transaction frame as stored, the JSON text of its serialized data, decoded on first use."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text: str = text
+
+    @staticmethod
+    def encode(data: Any) -> str:
+        return json.dumps(Utility.serialize_value(data), separators=(",", ":"))
+
+    def decode(self) -> Any:
+        return Utility.deserialize_value(json.loads(self.text))
+
+
+class FrameStack:
+    """The frames of a transaction, txid -> data, and the changes made to them since they were loaded.
+
+    Frames loaded from storage stay EncodedFrames until they are first read or
+    changed, so a hop only parses the frames it uses. A frame read that is then
+    changed in place, rather than through a recorded change, is logged whole;
+    replayed on a concurrent writer's state, it replaces theirs.
+    """
+
+    __slots__ = ("_stack", "_changes", "_bases")
+
+    def __init__(self, stack: Dict[str, Any]) -> None:
+        self._stack: Dict[str, Any] = stack
+        # changes since the frames were loaded, written to the transaction log as one delta
+        self._changes: List[List[Any]] = []
+        # txid -> the text of each frame read this hop, and the number of changes made before it was read
+        self._bases: Dict[str, Tuple[str, int]] = {}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def reducer(name: str) -> Callable[[Any, Any], Any]:
+        module, _, func = name.rpartition(".")
+        return getattr(importlib.import_module(module), func)  # type: ignore[no-any-return]
+
+    @staticmethod
+    def frame(stack: Dict[str, Any], txid: str) -> Any:
+        """The data of frame txid in stack, decoding it in place if it is still encoded."""
+        data: Any = stack.get(txid)
+        if isinstance(data, EncodedFrame):
+            data = stack[txid] = data.decode()
+        return data
+
+    @staticmethod
+    def apply(stack: Dict[str, Any], changes: List[List[Any]]) -> Dict[str, Any]:
+        """stack with changes, as recorded by set/reduce/push/pop, applied in place."""
+        for change in changes:
+            CHANGE_APPLIERS.get(change[0], _ignore)(stack, change)
+        return stack
+
+    @staticmethod
+    def decode(frames: List[List[str]]) -> Dict[str, Any]:
+        """A stack of the [txid, text] pairs written by encoded, each left encoded until used."""
+        return {txid: EncodedFrame(text) for txid, text in frames}
+
+    @property
+    def top(self) -> str:
+        return next(reversed(self._stack))
+
+    @property
+    def stack(self) -> Dict[str, Any]:
+        return {txid: self.read(txid) for txid in list(self._stack)}
+
+    def read(self, txid: str) -> Any:
+        """The data of frame txid, first noting its text so that changes made to it in place can be found."""
+        if txid not in self._bases:
+            data: Any = self._stack[txid]
+            text: str = data.text if isinstance(data, EncodedFrame) else EncodedFrame.encode(data)
+            self._bases[txid] = (text, len(self._changes))
+        return FrameStack.frame(self._stack, txid)
+
+    def change(self, change: List[Any]) -> None:
+        """Make change to the frames and record it."""
+        FrameStack.apply(self._stack, [change])
+        self._changes.append(change)
+
+    def pop(self) -> Any:
+        txid: str = self.top
+        data: Any = FrameStack.frame(self._stack, txid)
+        self.change(["pop", txid])
+        return data
+
+    def encoded(self) -> List[List[str]]:
+        """[txid, text] for every frame, reusing the stored text of frames that were never decoded."""
+        return [
+            [txid, data.text if isinstance(data, EncodedFrame) else EncodedFrame.encode(data)]
+            for txid, data in self._stack.items()
+        ]
+
+    @property
+    def changes(self) -> List[List[Any]]:
+        """The changes since the frames were loaded, including frames changed in place."""
+        self._changed_in_place()
+        return self._changes
+
+    def _changed_in_place(self) -> None:
+        """Log whole every frame read this hop whose data differs from what its logged changes make of it."""
+        for txid in [txid for txid in self._bases if txid in self._stack]:
+            current: str = EncodedFrame.encode(self._stack[txid])
+            if self._replayed(txid) != current:
+                self._changes.append(["frame", txid, self._stack[txid]])
+            self._bases[txid] = (current, len(self._changes))
+
+    def _replayed(self, txid: str) -> str:
+        """The text of frame txid as it was read this hop, with the changes logged for it since applied."""
+        text, start = self._bases[txid]
+        logged: List[List[Any]] = [change for change in self._changes[start:] if change[1] == txid]
+        return EncodedFrame.encode(FrameStack.apply({txid: EncodedFrame(text)}, logged)[txid]) if logged else text
+
+    def settle(self) -> None:
+        """Forget the changes so far, once they are stored."""
+        self._changes = []
+        self._bases = {}
+
+    def rebase(self, stack: Dict[str, Any]) -> None:
+        """Take stack for the current frames and replay the pending changes on it."""
+        self._stack = FrameStack.apply(stack, self.changes)
+        self._bases = {}
+
+
+def _set(stack: Dict[str, Any], change: List[Any]) -> None:
+    if change[1] in stack:
+        Utility.deep_set(FrameStack.frame(stack, change[1]), change[2], change[3])
+
+
+def _reduce(stack: Dict[str, Any], change: List[Any]) -> None:
+    if change[1] in stack:
+        data: Any = FrameStack.frame(stack, change[1])
+        current: Any = Utility.deep_get(data, change[2], None)
+        Utility.deep_set(data, change[2], change[4] if current is None else _reduced(current, change))
+
+
+def _reduced(current: Any, change: List[Any]) -> Any:
+    return FrameStack.reducer(change[3])(current, change[4])
+
+
+def _push(stack: Dict[str, Any], change: List[Any]) -> None:
+    stack[change[1]] = Transaction.create_tx(change[1])
+
+
+def _pop(stack: Dict[str, Any], change: List[Any]) -> None:
+    stack.pop(change[1], None)
+
+
+def _frame(stack: Dict[str, Any], change: List[Any]) -> None:
+    stack[change[1]] = change[2]
+
+
+def _ignore(stack: Dict[str, Any], change: List[Any]) -> None:
+    pass
+
+
+CHANGE_APPLIERS: Dict[str, Callable[[Dict[str, Any], List[Any]], None]] = {
+    "set": _set,
+    "reduce": _reduce,
+    "push": _push,
+    "pop": _pop,
+    "frame": _frame,
+}
+
 
 class Transaction:
+    """A stack of frames, txid -> data, ordered with the current frame on top.
+
+    The frames and the changes made to them are held by a FrameStack. A frame
+    read through get/peek that is then changed in place, rather than through
+    set/reduce, is logged whole.
+    """
+
+    __slots__ = ("_frames", "_log", "_log_key", "_log_head", "_log_depth")
+
     @staticmethod
     def create_tx(txid: Optional[str] = None, data: Optional[Any] = None) -> Dict[str, Any]:
         ret = {"txid": txid or Utility.unique_identifier()}
@@ -17,39 +197,98 @@ class Transaction:
         txid: Optional[str] = None,
         data: Optional[Any] = None,
         parentid: Optional[str] = None,
+        stack: Optional[Dict[str, Any]] = None,
     ) -> None:
-        self._stack: Dict[str, Any] = {}
-        if txid:
-            self._stack = {txid: data}
-        else:
+        self._frames: FrameStack = FrameStack(stack or ({txid: data} if txid else {}))
+        self._log: Optional["TransactionLog"] = None
+        self._log_key: Optional[str] = None
+        self._log_head: Optional[str] = None
+        self._log_depth: int = 0
+        if not (stack or txid):
             self.push()
 
+    @property
+    def stack(self) -> Dict[str, Any]:
+        return self._frames.stack
+
+    def frames(self) -> List[List[str]]:
+        """[txid, text] for every frame, reusing the stored text of frames that were never decoded."""
+        return self._frames.encoded()
+
+    @property
+    def changes(self) -> List[List[Any]]:
+        """The changes since the transaction was loaded, including frames changed in place."""
+        return self._frames.changes
+
+    @property
+    def log_key(self) -> Optional[str]:
+        return self._log_key
+
+    @property
+    def log_head(self) -> Optional[str]:
+        return self._log_head
+
+    @property
+    def log_depth(self) -> int:
+        return self._log_depth
+
+    def logged(self, log: "TransactionLog", log_key: Optional[str], log_head: Optional[str], log_depth: int) -> None:
+        """Record that the transaction's changes so far are stored in log under log_key as log_head."""
+        self._log = log
+        self._log_key = log_key
+        self._log_head = log_head
+        self._log_depth = log_depth
+        self._frames.settle()
+
+    def rebase(self, stack: Dict[str, Any], log_head: Optional[str], log_depth: int) -> None:
+        """Take stack, as of log_head, for the current state and replay the pending changes on it."""
+        self._frames.rebase(stack)
+        self._log_head = log_head
+        self._log_depth = log_depth
+
+    def commit(self) -> None:
+        """Store the pending changes now, folding in those other writers stored meanwhile.
+
+        Does nothing for a transaction that was not loaded from a TransactionLog.
+        """
+        if self._log is not None:
+            self._log.save(self)
+
     def push(self) -> None:
-        new_tx = Transaction.create_tx()
-        self._stack[new_tx["txid"]] = new_tx
+        self._frames.change(["push", Utility.unique_identifier()])
 
     def pop(self) -> Any:
-        return self._stack.pop(self.txid)
+        return self._frames.pop()
 
     def peek(self) -> Any:
-        return self._stack.get(self.txid)
+        return self._frames.read(self.txid)
 
     @staticmethod
     def from_str(txstr: str) -> "Transaction":
-        return Transaction(**(json.loads(txstr)))
+        content: Dict[str, Any] = json.loads(txstr)
+        return Transaction(content["txid"], Utility.deserialize_value(content.get("data")))
 
     @property
     def txid(self) -> str:
-        return list(self._stack.keys())[-1]
+        return self._frames.top
 
     def serialize(self) -> Any:
         return str(self)
 
     def __str__(self) -> str:
-        return json.dumps(Utility.serialize({"txid": self.txid, "data": self.peek()}, None))
+        return json.dumps({"txid": self.txid, "data": Utility.serialize_value(self.peek())})
 
     def set(self, key: str, value: Any) -> None:
-        Utility.deep_set(self.peek(), key, value)
+        self._frames.change(["set", self.txid, key, value])
+
+    def reduce(self, key: str, value: Any, reducer: str = "operator.add") -> None:
+        """Set key to reducer(current value, value), or to value if there is none.
+
+        reducer is the dotted name of a function. Unlike set, it is applied again
+        to the current state when the change is replayed on top of a concurrent
+        writer's, so concurrent reductions all count.
+        """
+        self._frames.change(["reduce", self.txid, key, reducer, value])
 
     def get(self, key: str, default: Optional[Any] = None) -> Any:
         return Utility.deep_get(self.peek(), key, default)
@@ -68,6 +307,7 @@ if __name__ == "__main__":
     print(tx.get("tx2"))
     print(str(tx))
     tx2 = Transaction.from_str(
-        '{"txid": "202309081814459840042fba40d5", "data": {"txid": "202309081814459840042fba40d5", "tx": "Transaction", "tx2": "Transaction2"}}'
+        '{"txid": "202309081814459840042fba40d5", '
+        '"data": {"txid": "202309081814459840042fba40d5", "tx": "Transaction", "tx2": "Transaction2"}}'
     )
     print("\n\n", str(tx2))
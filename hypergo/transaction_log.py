@@ -0,0 +1,193 @@
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from hypergo.storage import Storage, VersionConflictError
+from hypergo.transaction import FrameStack, Transaction
+from hypergo.utility import Utility
+
+LOG_PREFIX: str = "transactionlog_"
+TRANSACTION_PREFIX: str = "transactionkey_"
+# a snapshot replaces the delta every this many hops, bounding how far a reader walks back
+COMPACT_EVERY: int = 16
+DEFAULT_MAXSIZE: int = 256
+
+State = Dict[str, Any]
+
+
+class TransactionLog:
+    """Transactions stored as a chain of per-hop deltas instead of rewritten whole.
+
+    transactionkey_<txid> holds {"log": <head>}, a pointer to the newest log
+    node. A node is either a delta, {"parent": <node>, "depth": n, "changes":
+    [...]}, holding the set/reduce/push/pop calls of one hop and the data of
+    any frame changed in place after being read through get, or a snapshot,
+    {"parent": null, "depth": 0, "frames": [[txid, data], ...]}, with the data
+    of each frame as JSON text so that readers only parse the frames they use.
+    Snapshots are written for a transaction's first node under a key and then
+    every COMPACT_EVERY hops, so each key's nodes form a chain of their own;
+    once a snapshot is appended, the nodes behind it are deleted. Nodes are
+    never rewritten, so the state folded at a node is cached and a reader
+    usually only applies the newest delta.
+    """
+
+    _states: "OrderedDict[str, Tuple[bytes, int]]" = OrderedDict()
+    _lock: threading.Lock = threading.Lock()
+
+    def __init__(self, storage: Storage, compact_every: int = COMPACT_EVERY, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self._storage: Storage = storage
+        self._compact_every: int = compact_every
+        self._maxsize: int = maxsize
+
+    @staticmethod
+    def transaction_key(transaction: Transaction) -> str:
+        return f"{TRANSACTION_PREFIX}{transaction.txid}"
+
+    def _cached(self, node_key: str) -> Optional[Tuple[State, int]]:
+        with TransactionLog._lock:
+            entry: Optional[Tuple[bytes, int]] = TransactionLog._states.get(node_key)
+            if entry is None:
+                return None
+            TransactionLog._states.move_to_end(node_key)
+        return pickle.loads(entry[0]), entry[1]
+
+    def _cache(self, node_key: str, state: State, depth: int) -> None:
+        try:
+            pickled: bytes = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        with TransactionLog._lock:
+            TransactionLog._states[node_key] = (pickled, depth)
+            while len(TransactionLog._states) > self._maxsize:
+                TransactionLog._states.popitem(last=False)
+
+    def _base(self, head: str) -> Tuple[State, int, List[Dict[str, Any]]]:
+        """The state at the newest cached node or snapshot behind head, its depth and the deltas since, newest first."""
+        deltas: List[Dict[str, Any]] = []
+        node_key: Optional[str] = head
+        while node_key is not None:
+            cached: Optional[Tuple[State, int]] = self._cached(node_key)
+            if cached is not None:
+                return cached[0], cached[1], deltas
+            node: Dict[str, Any] = json.loads(self._storage.load(node_key))
+            if "frames" in node:
+                return FrameStack.decode(node["frames"]), 0, deltas
+            deltas.append(node)
+            node_key = node["parent"]
+        return {}, 0, deltas
+
+    def fold(self, head: str) -> Tuple[State, int]:
+        """The transaction stack as of log node head, and head's depth."""
+        state, depth, deltas = self._base(head)
+        for delta in reversed(deltas):
+            state = FrameStack.apply(state, Utility.deserialize_value(delta["changes"]))
+            depth = delta["depth"]
+        if deltas:
+            self._cache(head, state, depth)
+        return state, depth
+
+    def _read(self, record: Optional[str]) -> Tuple[State, Optional[str], int]:
+        """The stack held by a transactionkey_ record, its log head and depth."""
+        if record is None:
+            return {}, None, 0
+        content: Dict[str, Any] = json.loads(record)
+        if "log" not in content:
+            # written whole by an earlier version
+            return Transaction.from_str(record).stack, None, 0
+        state, depth = self.fold(content["log"])
+        return state, content["log"], depth
+
+    def new(self) -> Transaction:
+        transaction: Transaction = Transaction()
+        transaction.logged(self, None, None, 0)
+        return transaction
+
+    def load(self, key: str) -> Transaction:
+        record: str = self._storage.load(key)
+        try:
+            state, head, depth = self._read(record)
+        except (KeyError, ValueError, json.JSONDecodeError):
+            # the nodes were deleted by a compaction since the record was read
+            latest: str = self._storage.load(key)
+            if latest == record:
+                raise
+            state, head, depth = self._read(latest)
+        transaction: Transaction = Transaction(stack=state)
+        transaction.logged(self, key, head, depth)
+        return transaction
+
+    def node(self, transaction: Transaction, chained: bool = True) -> Dict[str, Any]:
+        """The log node recording transaction's pending changes; a snapshot unless chained to its log head."""
+        depth: int = transaction.log_depth + 1
+        if not chained or transaction.log_head is None or depth >= self._compact_every:
+            return {"parent": None, "depth": 0, "frames": transaction.frames()}
+        return {"parent": transaction.log_head, "depth": depth, "changes": Utility.serialize_value(transaction.changes)}
+
+    def save(self, transaction: Transaction) -> str:
+        """Append transaction's pending changes to its log and return the key it is now stored under.
+
+        The record is replaced with compare-and-swap: when another writer
+        appended to the same transaction since it was loaded, or the transaction
+        was popped back to a parent stored meanwhile, the pending changes are
+        replayed on top of the stored state, so concurrent branches never lose
+        updates.
+        """
+        key: str = TransactionLog.transaction_key(transaction)
+        if not transaction.changes and key == transaction.log_key:
+            return key
+
+        # (node key, depth, superseded head) of the node written by the latest compare-and-swap attempt
+        appended: List[Tuple[str, int, Optional[str]]] = []
+        try:
+            self._storage.update(key, partial(self._append, transaction, key, appended))
+        except VersionConflictError:
+            self._discard(appended)
+            raise
+        node_key, depth, superseded = appended[0]
+        transaction.logged(self, key, node_key, depth)
+        if depth == 0:
+            self._collect(superseded)
+        return key
+
+    def _append(
+        self, transaction: Transaction, key: str, appended: List[Tuple[str, int, Optional[str]]], record: Optional[str]
+    ) -> str:
+        """Write transaction's next log node on top of record and return the record pointing to it."""
+        self._discard(appended)
+        chained: bool = key == transaction.log_key or record is not None
+        head: Optional[str] = self._rebase(transaction, key, record) if chained else None
+        node: Dict[str, Any] = self.node(transaction, chained)
+        node_key: str = f"{LOG_PREFIX}{Utility.unique_identifier()}"
+        self._storage.save(node_key, json.dumps(node))
+        appended.append((node_key, node["depth"], head))
+        return json.dumps({"log": node_key})
+
+    def _rebase(self, transaction: Transaction, key: str, record: Optional[str]) -> Optional[str]:
+        """Replay transaction on the state in record if another writer stored it meanwhile; record's log head."""
+        state, head, depth = self._read(record)
+        if key != transaction.log_key or head != transaction.log_head:
+            transaction.rebase(state, head, depth)
+        return head
+
+    def _discard(self, appended: List[Tuple[str, int, Optional[str]]]) -> None:
+        """Delete the node written by an attempt that lost the compare-and-swap, if any."""
+        if appended:
+            self._delete([appended.pop()[0]])
+
+    def _delete(self, node_keys: List[str]) -> None:
+        for node_key in node_keys:
+            self._storage.delete(node_key)
+            with TransactionLog._lock:
+                TransactionLog._states.pop(node_key, None)
+
+    def _collect(self, head: Optional[str]) -> None:
+        """Delete head and the nodes behind it, back to their snapshot, once a newer snapshot replaced them."""
+        node_keys: List[str] = []
+        node_key: Optional[str] = head
+        while node_key is not None:
+            node_keys.append(node_key)
+            node_key = json.loads(self._storage.load(node_key))["parent"]
+        self._delete(node_keys)
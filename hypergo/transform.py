@@ -1,21 +1,37 @@
 import os
-from functools import wraps
-from typing import (Any, Callable, Dict, Generator, List, Tuple, TypeVar,
-                    Union, cast)
+from functools import partial, wraps
+from itertools import repeat
+from typing import (Any, Callable, Dict, Generator, Iterable, List, NamedTuple,
+                    Optional, Tuple, TypeVar, Union, cast)
 
+from hypergo import codecs
+from hypergo.buffers import DEFAULT_BUFFER_THRESHOLD, BufferCodec
+from hypergo.content_store import (DEFAULT_CHUNK_SIZE, DEFAULT_INDEX_DEPTH,
+                                   READ_CACHE, ContentStore)
 from hypergo.custom_types import JsonDict, TypedDictType
+from hypergo.envelope import Envelope
+from hypergo.keyring import CIPHERS, ENCRYPTIONKEY, KeyRing
+from hypergo.secrets import Secrets
 from hypergo.storage import Storage
-from hypergo.transaction import Transaction
-from hypergo.utility import Utility, root_node
+from hypergo.transaction_log import TransactionLog
+from hypergo.utility import MISSING, Utility, root_node
 
-T = TypeVar("T")
+# ENCRYPTIONKEY moved to hypergo.keyring and is still importable from here
+__all__ = [
+    "ENCRYPTIONKEY",
+    "ByReferenceOptions",
+    "CompressionOptions",
+    "Transform",
+    "TransformPipeline",
+    "config_v0_v1_passbyreference_backward_compatible",
+]
 
-ENCRYPTIONKEY = "KRAgZMBXbP1OQQEJPvMTa6nfkVq63sgL2ULJIaMgfLA="
+T = TypeVar("T")
 
 
 def config_v0_v1_passbyreference_backward_compatible(func: Callable[..., Any]) -> Callable[..., Any]:
     @wraps(func)
-    def wrapper(data: Any, key: str, *args: Tuple[Any, ...]) -> Any:
+    def wrapper(data: Any, key: str, *args: Tuple[Any, ...], **kwargs: Any) -> Any:
         use_key = key
         if key == "__root__":
             popped = data["__root__"].pop("body") if Utility.deep_has(data, "__root__.body") else None
@@ -27,85 +43,249 @@ def config_v0_v1_passbyreference_backward_compatible(func: Callable[..., Any]) -
                 if popped:
                     use_key = "__root__.body"
                     data["__root__"]["body"] = popped
-        return func(data, use_key, *args)
+        return func(data, use_key, *args, **kwargs)
 
     return wrapper
 
 
+Stage = Callable[[Any, Any], Any]
+# (key, options) pairs of a configured operation
+KeyedOptions = List[Tuple[Optional[str], Dict[str, Any]]]
+
+
+class CompressionOptions(NamedTuple):
+    """The options of compression for one key."""
+
+    codec: str = codecs.DEFAULT_CODEC
+    level: Optional[int] = None
+    threshold: int = 0
+    dictionary: Optional[str] = None
+
+
+class ByReferenceOptions(NamedTuple):
+    """The options of pass_by_reference for one key; storing and fetching each read their own."""
+
+    dedup: bool = False
+    digest: str = "md5"
+    threshold: Optional[int] = None
+    max_message_size: Optional[int] = None
+    chunked: bool = False
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    # configured as "index", which a tuple field cannot be named
+    indexed: Union[bool, int] = False
+    cache: bool = False
+    stream: bool = False
+    lazy: bool = False
+
+    @staticmethod
+    def of(options: Dict[str, Any]) -> "ByReferenceOptions":
+        settings: Dict[str, Any] = dict(options)
+        if "index" in settings:
+            settings["indexed"] = settings.pop("index")
+        return ByReferenceOptions(**settings)
+
+
 class Transform:
+    # operations applied around every execution, outermost first
+    OPERATIONS: List[str] = [
+        "contextualization",
+        "pass_by_reference",
+        "compression",
+        "encryption",
+        "serialization",
+        "transaction",
+    ]
+    # operations that always run, once, on the whole value
+    IMPLICIT_OPERATIONS: List[str] = ["contextualization", "transaction"]
+    # operations that leave an in-memory Envelope to be sealed for the wire
+    ENVELOPE_OPERATIONS: List[str] = ["compression", "encryption"]
+
+    @staticmethod
+    def operation_table(storage: Optional[Storage], secrets: Optional[Secrets] = None) -> Dict[str, List[List[Any]]]:
+        transactions: Optional[Storage] = storage.use_sub_path("transactions") if storage else None
+        dictionaries: Optional[codecs.Dictionaries] = (
+            codecs.Dictionaries(storage.use_sub_path("dictionaries")) if storage else None
+        )
+        buffers: Optional[Storage] = storage.use_sub_path("buffers") if storage else None
+        keyring: KeyRing = KeyRing.for_secrets(secrets)
+        return {
+            "compression": [[Transform.uncompress, dictionaries], [Transform.compress, dictionaries]],
+            "serialization": [
+                [Transform.deserialize, buffers],
+                [Transform.serialize, buffers],
+            ],
+            "pass_by_reference": [
+                [Transform.fetchbyreference, storage],
+                [Transform.storebyreference, storage],
+            ],
+            "encryption": [
+                [Transform.decrypt, keyring],
+                [Transform.encrypt, keyring],
+            ],
+            "contextualization": [
+                [Transform.add_context, storage],
+                [Transform.remove_context],
+            ],
+            "transaction": [
+                [Transform.restore_transaction, transactions],
+                [Transform.stash_transaction, transactions],
+            ],
+        }
+
+    @staticmethod
+    def operation_keys(op_name: str, operations: Dict[str, Any]) -> Optional[KeyedOptions]:
+        """(key, options) pairs an operation applies to, or None when it is not configured.
+
+        An operation is configured either with a list of keys or with a mapping of
+        key to the options passed to the operation for that key, e.g.
+        {"compression": {"message.body": {"codec": "zlib", "threshold": 1024}}}.
+        """
+        if op_name in Transform.IMPLICIT_OPERATIONS:
+            return [(None, {})]
+        if op_name not in operations:
+            return None
+        return Transform._keyed_options(operations[op_name] or [None])
+
+    @staticmethod
+    def _keyed_options(spec: Union[List[Optional[str]], Dict[str, Any]]) -> KeyedOptions:
+        pairs: Iterable[Tuple[Optional[str], Any]] = spec.items() if isinstance(spec, dict) else zip(spec, repeat(None))
+        return [(key, dict(options or {})) for key, options in pairs]
+
     @staticmethod
     def operation(op_name: str) -> Callable[..., Any]:
         def decorator(func: Callable[..., Generator[T, None, None]]) -> Callable[..., Generator[T, None, None]]:
             @wraps(func)
             # mypy: allow-untyped-defs
             def wrapper(self: Any, data: Any) -> Generator[T, None, None]:
-                args: List[List[Any]] = {
-                    "compression": [[Utility.uncompress], [Utility.compress]],
-                    "serialization": [
-                        [Utility.deserialize],
-                        [Utility.serialize],
-                    ],
-                    "pass_by_reference": [
-                        [Transform.fetchbyreference, self.storage],
-                        [Transform.storebyreference, self.storage],
-                    ],
-                    "encryption": [
-                        [Utility.decrypt, ENCRYPTIONKEY],
-                        [Utility.encrypt, ENCRYPTIONKEY],
-                    ],
-                    "contextualization": [
-                        [Transform.add_context, self.storage, self.config],
-                        [Transform.remove_context],
-                    ],
-                    "transaction": [
-                        [
-                            Transform.restore_transaction,
-                            self.storage.use_sub_path("transactions"),
-                        ],
-                        [
-                            Transform.stash_transaction,
-                            self.storage.use_sub_path("transactions"),
-                        ],
-                    ],
-                }[op_name]
-                input_operations = Utility.deep_get(self.config, "input_operations", {})
-                output_operations = Utility.deep_get(self.config, "output_operations", {})
-
-                for oper in ["contextualization", "transaction"]:
-                    input_operations[oper] = []
-                    output_operations[oper] = []
-                if op_name in input_operations:
-                    for key in input_operations[op_name] or [None]:
-                        data = args[0][0](data, key, *args[0][1:])
+                args: List[List[Any]] = self.transforms.table[op_name]
+                if op_name == "contextualization":
+                    args = [args[0] + [self.config], args[1]]
+                input_keys = Transform.operation_keys(op_name, Utility.deep_get(self.config, "input_operations", {}))
+                output_keys = Transform.operation_keys(op_name, Utility.deep_get(self.config, "output_operations", {}))
+
+                for key, options in input_keys or []:
+                    data = args[0][0](data, key, *args[0][1:], **options)
 
                 for result in func(self, data):
-                    if op_name in output_operations:
-                        for key in output_operations[op_name] or [None]:
-                            result = args[1][0](result, key, *args[1][1:])
+                    for key, options in output_keys or []:
+                        result = args[1][0](result, key, *args[1][1:], **options)
+                        if op_name in Transform.ENVELOPE_OPERATIONS:
+                            result = Transform.seal(result, key)
                     yield result
 
             return wrapper
 
         return decorator
 
+    @staticmethod
+    def pipeline(func: Callable[..., Generator[T, None, None]]) -> Callable[..., Generator[T, None, None]]:
+        """Run func through the executor's precompiled TransformPipeline."""
+
+        @wraps(func)
+        def wrapper(self: Any, data: Any) -> Generator[T, None, None]:
+            return cast(Generator[T, None, None], self.transforms.run(self, data, partial(func, self)))
+
+        return wrapper
+
+    @staticmethod
+    @root_node
+    def compress(data: Any, key: str, dictionaries: Optional[codecs.Dictionaries], **options: Any) -> Any:
+        settings: CompressionOptions = CompressionOptions(**options)
+        value: Any = Utility.deep_get(data, key)
+        envelope: Envelope = Envelope.wrap(value)
+        if len(envelope.payload) < settings.threshold:
+            # too small to be worth compressing: the value travels as is, except that a
+            # string is wrapped so it cannot be mistaken for a legacy compressed value
+            if isinstance(value, str):
+                Utility.deep_set(data, key, envelope)
+            return data
+        if settings.dictionary is None:
+            Utility.deep_set(data, key, codecs.compress(envelope, settings.codec, settings.level))
+        elif dictionaries is None:
+            raise ValueError(f"Compressing with dictionary {settings.dictionary} requires a storage to load it from")
+        else:
+            zdict: bytes = dictionaries.load(settings.dictionary)
+            compressed: Envelope = codecs.compress_with_dictionary(envelope, settings.dictionary, zdict, settings.level)
+            Utility.deep_set(data, key, compressed)
+        return data
+
+    @staticmethod
+    @root_node
+    def uncompress(data: Any, key: str, dictionaries: Optional[codecs.Dictionaries], **_: Any) -> Any:
+        value: Any = Utility.deep_get(data, key)
+        envelope: Optional[Envelope] = Envelope.open(value)
+        if envelope is None:
+            # a value below the writer's threshold is left as is
+            return Utility.uncompress(data, key) if isinstance(value, str) else data
+        if codecs.is_compressed(envelope):
+            envelope = codecs.decompress(envelope, dictionaries)
+        Utility.deep_set(data, key, envelope.unwrap())
+        return data
+
+    @staticmethod
+    @root_node
+    def encrypt(data: Any, key: str, keyring: KeyRing, cipher: str = "fernet", key_id: Optional[str] = None) -> Any:
+        envelope: Envelope = Envelope.wrap(Utility.deep_get(data, key))
+        encrypted: bytes = keyring.cipher(cipher, key_id).encrypt(bytes(envelope.payload))
+        # the layer names the key, so readers pick the right one after a rotation
+        layer: List[Any] = [cipher] if key_id is None else [cipher, key_id]
+        Utility.deep_set(data, key, envelope.push(layer, encrypted))
+        return data
+
+    @staticmethod
+    @root_node
+    def decrypt(data: Any, key: str, keyring: KeyRing, **_: Any) -> Any:
+        envelope: Optional[Envelope] = Envelope.open(Utility.deep_get(data, key))
+        if envelope is None:
+            return Utility.decrypt(data, key, keyring.key(None))
+        layer, payload = envelope.expect(*CIPHERS)
+        decrypted: bytes = keyring.cipher(layer[0], layer[1] if len(layer) > 1 else None).decrypt(bytes(payload))
+        Utility.deep_set(data, key, envelope.pop(decrypted).unwrap())
+        return data
+
+    @staticmethod
+    @root_node
+    def serialize(
+        data: Any, key: str, storage: Optional[Storage], buffer_threshold: int = DEFAULT_BUFFER_THRESHOLD
+    ) -> Any:
+        value: Any = Utility.deep_get(data, key, MISSING)
+        if value is not MISSING:
+            Utility.deep_set(data, key, Utility.serialize_value(value, BufferCodec(storage, buffer_threshold).encode))
+        return data
+
+    @staticmethod
+    @root_node
+    def deserialize(data: Any, key: str, storage: Optional[Storage], **_: Any) -> Any:
+        value: Any = Utility.deep_get(data, key, MISSING)
+        if value is not MISSING:
+            Utility.deep_set(data, key, Utility.deserialize_value(value, BufferCodec(storage).decoders))
+        return data
+
+    @staticmethod
+    @root_node
+    def seal(data: Any, key: str) -> Any:
+        value: Any = Utility.deep_get(data, key, None)
+        if isinstance(value, Envelope):
+            Utility.deep_set(data, key, value.encode())
+        return data
+
     @staticmethod
     def restore_transaction(data: Any, key: str, storage: Storage) -> Any:
         transaction = None
         txid = Utility.deep_get(data, "message.transaction", None)
         if not txid:
-            transaction = Transaction()
+            transaction = TransactionLog(storage).new()
             txid = f"transactionkey_{transaction.txid}"
             Utility.deep_set(data, "message.transaction", transaction.txid)
         else:
-            transaction = Transaction.from_str(storage.load(txid))
+            transaction = TransactionLog(storage).load(txid)
         Utility.deep_set(data, "transaction", transaction)
         return data
 
     @staticmethod
     def stash_transaction(data: Any, key: str, storage: Storage) -> Any:
         transaction = Utility.deep_get(data, 'transaction')
-        txid = f"transactionkey_{transaction.txid}"
-        storage.save(txid, str(transaction))
+        txid = TransactionLog(storage).save(transaction)
         Utility.deep_set(data, "message.transaction", txid)
         return data
 
@@ -131,24 +311,173 @@ class Transform:
     @root_node
     @config_v0_v1_passbyreference_backward_compatible
     def storebyreference(
-        data: Union[TypedDictType, Dict[str, Any]], key: str, base_storage: Storage
+        data: Union[TypedDictType, Dict[str, Any]], key: str, base_storage: Storage, **options: Any
     ) -> Union[TypedDictType, Dict[str, Any]]:
-        storage: Storage = base_storage.use_sub_path("passbyreference")
-        str_result = Utility.stringify(Utility.deep_get(data, key))
-        out_storage_key = f"storagekey_{Utility.hash(str_result)}"
-        storage.save(out_storage_key, str_result)
-        Utility.deep_set(data, key, out_storage_key)
+        settings: ByReferenceOptions = ByReferenceOptions.of(options)
+        store: ContentStore = ContentStore.for_storage(base_storage)
+        value: Any = Utility.deep_get(data, key)
+        if settings.chunked:
+            Utility.deep_set(data, key, store.put_chunked(value, settings.digest, settings.dedup, settings.chunk_size))
+            return data
+        str_result = Utility.stringify(value)
+        if settings.threshold is not None and Transform.inlinable(data, value, str_result, store, settings):
+            return data
+        Utility.deep_set(data, key, Transform._store_value(store, value, str_result, settings))
         return data
 
+    @staticmethod
+    def _store_value(store: ContentStore, value: Any, str_result: str, settings: ByReferenceOptions) -> str:
+        """The claim check of value, stored whole or, with settings.indexed, with an index of its fields."""
+        if not settings.indexed:
+            return store.put(str_result, settings.digest, settings.dedup)
+        # index: true covers the default depth, an int sets the depth
+        depth: int = DEFAULT_INDEX_DEPTH if settings.indexed is True else int(settings.indexed)
+        return store.put_indexed(value, settings.digest, settings.dedup, depth)
+
+    @staticmethod
+    def inlinable(data: Any, value: Any, str_result: str, store: ContentStore, settings: ByReferenceOptions) -> bool:
+        """Whether a claim-checked value is small enough to travel in the message itself."""
+        if len(str_result.encode("utf-8")) >= cast(int, settings.threshold) or store.is_key(value):
+            # a string that looks like a claim check has to be offloaded to stay unambiguous
+            return False
+        if settings.max_message_size is None:
+            return True
+        message: Any = Utility.deep_get(data, "__root__.message", Utility.deep_get(data, "__root__"))
+        return len(Utility.stringify(message).encode("utf-8")) <= settings.max_message_size
+
     @staticmethod
     @root_node
     @config_v0_v1_passbyreference_backward_compatible
     def fetchbyreference(
-        data: Union[TypedDictType, Dict[str, Any]], key: str, base_storage: Storage
+        data: Union[TypedDictType, Dict[str, Any]], key: str, base_storage: Storage, **options: Any
     ) -> Union[TypedDictType, Dict[str, Any]]:
-        storage = base_storage.use_sub_path("passbyreference")
         storage_key = Utility.deep_get(cast(JsonDict, data), key)
-        loaded = storage.load(storage_key)
-        the_data = Utility.objectify(loaded)
-        Utility.deep_set(data, key, the_data)
+        store: ContentStore = ContentStore.for_storage(base_storage)
+        if not store.is_key(storage_key):
+            # inlined by a claim-check writer
+            return data
+        Utility.deep_set(data, key, Transform._fetch_value(store, storage_key, ByReferenceOptions.of(options)))
         return data
+
+    @staticmethod
+    def _fetch_value(store: ContentStore, storage_key: str, settings: ByReferenceOptions) -> Any:
+        """The value stored under the claim check storage_key."""
+        if ContentStore.is_chunked(storage_key):
+            # streamed payloads are handed to the component as a lazy iterator of records
+            return store.iter_records(storage_key) if settings.stream else store.load_chunked(storage_key)
+        if settings.lazy:
+            # only the fields the component's bindings reach are read
+            return store.load_lazy(storage_key)
+        if settings.cache:
+            return READ_CACHE.parsed(storage_key, store.load)
+        return Utility.objectify(store.load(storage_key))
+
+
+def _plain_stage(func: Callable[..., Any], key: Optional[str], args: List[Any], options: Dict[str, Any]) -> Stage:
+    return lambda executor, data: func(data, key, *args, **options)
+
+
+def _context_stage(func: Callable[..., Any], key: Optional[str], args: List[Any], options: Dict[str, Any]) -> Stage:
+    # the context carries the per-message config of the executor running the stage
+    return lambda executor, data: func(data, key, *args, executor.config)
+
+
+def _claim_check_stage(func: Callable[..., Any], key: Optional[str], args: List[Any], options: Dict[str, Any]) -> Stage:
+    if "threshold" not in options:
+        return _plain_stage(func, key, args, options)
+    # the claim check also offloads values that would push the message past the connection's limit
+    return lambda executor, data: func(
+        data, key, *args, **{"max_message_size": getattr(executor, "max_message_size", None), **options}
+    )
+
+
+StageBuilder = Callable[[Callable[..., Any], Optional[str], List[Any], Dict[str, Any]], Stage]
+
+# how TransformPipeline.stage calls the transforms that need more than their key and options
+STAGE_BUILDERS: Dict[Callable[..., Any], StageBuilder] = {
+    Transform.add_context: _context_stage,
+    Transform.storebyreference: _claim_check_stage,
+}
+
+
+class TransformPipeline:
+    """The transform operations of one config, compiled into flat stage lists.
+
+    Equivalent to stacking Transform.operation for every entry of
+    Transform.OPERATIONS, but the operation table, storage sub paths and
+    configured keys are resolved once, unconfigured operations are dropped, and
+    every input and output runs through a single loop instead of one generator
+    per operation.
+    """
+
+    # the outermost envelope operation is the last to touch a value on the way out
+    SEALING_OPERATION: str = next(op for op in Transform.OPERATIONS if op in Transform.ENVELOPE_OPERATIONS)
+
+    def __init__(self, config: Dict[str, Any], storage: Optional[Storage], secrets: Optional[Secrets] = None) -> None:
+        self._storage: Optional[Storage] = storage
+        self._secrets: Optional[Secrets] = secrets
+        self._table: Dict[str, List[List[Any]]] = Transform.operation_table(storage, secrets)
+        self._input_stages: List[Stage] = self._compile_inputs(Utility.deep_get(config, "input_operations", {}))
+        self._output_stages: List[Stage] = self._compile_outputs(Utility.deep_get(config, "output_operations", {}))
+
+    def _compile_inputs(self, operations: Dict[str, Any]) -> List[Stage]:
+        return [stage for op_name in Transform.OPERATIONS for stage in self._stages(op_name, 0, operations)]
+
+    def _compile_outputs(self, operations: Dict[str, Any]) -> List[Stage]:
+        stages: List[Stage] = []
+        for op_name in reversed(Transform.OPERATIONS):
+            stages.extend(self._stages(op_name, 1, operations))
+            if op_name == TransformPipeline.SEALING_OPERATION:
+                stages.extend(TransformPipeline._seals(operations))
+        return stages
+
+    def _stages(self, op_name: str, direction: int, operations: Dict[str, Any]) -> List[Stage]:
+        """The stages of op_name, for its input (direction 0) or output (1) side, one per configured key."""
+        spec: List[Any] = self._table[op_name][direction]
+        keys: KeyedOptions = Transform.operation_keys(op_name, operations) or []
+        return [TransformPipeline.stage(spec, key, options) for key, options in keys]
+
+    @staticmethod
+    def _seals(operations: Dict[str, Any]) -> List[Stage]:
+        """Envelopes stay binary between operations; these stages base64-encode each once."""
+        keys: Dict[Optional[str], None] = dict.fromkeys(
+            key
+            for op_name in reversed(Transform.ENVELOPE_OPERATIONS)
+            for key, _ in Transform.operation_keys(op_name, operations) or []
+        )
+        return [TransformPipeline.stage([Transform.seal], key) for key in keys]
+
+    @staticmethod
+    def stage(spec: List[Any], key: Optional[str], options: Optional[Dict[str, Any]] = None) -> Stage:
+        return STAGE_BUILDERS.get(spec[0], _plain_stage)(spec[0], key, spec[1:], options or {})
+
+    @property
+    def storage(self) -> Optional[Storage]:
+        return self._storage
+
+    @property
+    def secrets(self) -> Optional[Secrets]:
+        return self._secrets
+
+    @property
+    def table(self) -> Dict[str, List[List[Any]]]:
+        """The operation table the stages were compiled from, by operation name: [input spec, output spec]."""
+        return self._table
+
+    @property
+    def input_stages(self) -> List[Stage]:
+        return list(self._input_stages)
+
+    @property
+    def output_stages(self) -> List[Stage]:
+        return list(self._output_stages)
+
+    def run(
+        self, executor: Any, data: Any, func: Callable[[Any], Iterable[T]]
+    ) -> Generator[T, None, None]:
+        for stage in self._input_stages:
+            data = stage(executor, data)
+        for result in func(data):
+            for stage in self._output_stages:
+                result = stage(executor, result)
+            yield result
@@ -0,0 +1,83 @@
+from itertools import chain
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CONTAINER_TYPES = (dict, list, tuple)
+
+Leaf = Callable[[Any], Any]
+Prune = Callable[[Any], bool]
+
+# by exact type, so subclasses such as OrderedDict are leaves, as in the recursive traversal
+CHILDREN: Dict[type, Callable[[Any], List[Any]]] = {
+    dict: lambda node: list(chain.from_iterable(node.items())),
+    list: list,
+    tuple: list,
+}
+REBUILD: Dict[type, Callable[[List[Any]], Any]] = {
+    dict: lambda results: dict(zip(results[::2], results[1::2])),
+    list: lambda results: results,
+    tuple: tuple,
+}
+
+
+class _Frame:
+    __slots__ = ("node", "children", "index", "results", "changed")
+
+    def __init__(self, node: Any, children: List[Any]) -> None:
+        self.node: Any = node
+        self.children: List[Any] = children
+        self.index: int = 0
+        self.results: List[Any] = []
+        self.changed: bool = False
+
+    def add(self, result: Any) -> bool:
+        """Record the result for the current child; whether another child is left to visit."""
+        self.results.append(result)
+        self.changed = self.changed or result is not self.children[self.index]
+        self.index += 1
+        return self.index < len(self.children)
+
+    def rebuild(self) -> Any:
+        return REBUILD[type(self.node)](self.results) if self.changed else self.node
+
+
+def _visit(node: Any, leaf: Leaf, prune: Optional[Prune], stack: List[_Frame]) -> Tuple[bool, Any]:
+    """(True, first child) after pushing a frame for a non-empty container, else (False, the result for node)."""
+    if prune is not None and prune(node):
+        return False, node
+    children: Optional[Callable[[Any], List[Any]]] = CHILDREN.get(type(node))
+    if children is None:
+        return False, leaf(node)
+    if not node:
+        return False, node
+    stack.append(_Frame(node, children(node)))
+    return True, stack[-1].children[0]
+
+
+def _ascend(stack: List[_Frame], result: Any) -> Tuple[bool, Any]:
+    """Hand result up the stack: (True, next node to visit), or (False, the result for the whole value)."""
+    while stack:
+        frame: _Frame = stack[-1]
+        if frame.add(result):
+            return True, frame.children[frame.index]
+        stack.pop()
+        result = frame.rebuild()
+    return False, result
+
+
+def traverse(value: Any, leaf: Leaf, prune: Optional[Prune] = None) -> Any:
+    """Apply leaf to every node of value that is not a dict, list or tuple (dict keys included).
+
+    Iterative, so nesting depth is not limited by the recursion limit.
+    Containers none of whose descendants changed are returned as they are
+    rather than copied, and a node for which prune returns True is returned
+    as it is without being visited.
+    """
+    stack: List[_Frame] = []
+    node: Any = value
+    while True:
+        descended, item = _visit(node, leaf, prune, stack)
+        if not descended:
+            pending, item = _ascend(stack, item)
+            if not pending:
+                return item
+        node = item
@@ -4,22 +4,23 @@ import base64
 import binascii
 import cProfile
 import hashlib
-import inspect
 import json
 import lzma
 import os
 import random
+import re
 import string
 import uuid
+from abc import ABC, abstractmethod
 from collections import deque
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 from importlib import import_module
 from itertools import chain
 from sys import getsizeof, stderr
 from types import ModuleType
-from typing import (Any, Callable, Dict, Mapping, Optional, Tuple, Type, Union,
-                    cast, get_origin)
+from typing import (Any, Callable, Dict, List, Mapping, NamedTuple, Optional,
+                    Pattern, Tuple, Type, Union, cast, get_origin)
 
 import dill
 import pydash
@@ -27,7 +28,10 @@ import yaml
 from cryptography.fernet import Fernet
 from line_profiler import LineProfiler
 
+from hypergo import codecs
 from hypergo.custom_types import JsonType, TypedDictType
+from hypergo.envelope import Envelope
+from hypergo.traversal import traverse
 
 
 def get_random_string(length):
@@ -106,31 +110,175 @@ def do_line_profile(func: Callable[..., Any]) -> Callable[..., Any]:
     return profiled_func
 
 
-def traverse_datastructures(func: Callable[..., Any]) -> Callable[..., Any]:
-    @wraps(func)
-    def wrapper(value: Any, *args: Tuple[Any, ...]) -> Any:
-        handlers: Dict[type, Callable[[Any], Any]] = {
-            dict: lambda _dict, *args: {wrapper(key, *args): wrapper(val, *args) for key, val in _dict.items()},
-            list: lambda _list, *args: [wrapper(item, *args) for item in _list],
-            tuple: lambda _tuple, *args: tuple(wrapper(item, *args) for item in _tuple),
-        }
-        return handlers.get(type(value), func)(value, *args)
+def traverse_datastructures(
+    func: Optional[Callable[..., Any]] = None, *, prune: Optional[Callable[[Any], bool]] = None
+) -> Callable[..., Any]:
+    """Apply func to every leaf of dicts (keys included), lists and tuples; see hypergo.traversal.traverse.
 
-    return wrapper
+    Usable as @traverse_datastructures or @traverse_datastructures(prune=predicate).
+    """
+
+    def decorator(leaf_func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(leaf_func)
+        def wrapper(value: Any, *args: Tuple[Any, ...]) -> Any:
+            return traverse(value, lambda leaf: leaf_func(leaf, *args), prune)
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+MISSING: Any = object()
+
+# a serialized non JSON-native value is a dict {SERIALIZATION_TAG: "pickle", "data": ..., "buffers": [...]}
+SERIALIZATION_TAG: str = "__hypergo_type__"
+JSON_SCALAR_TYPES: Tuple[type, ...] = (str, int, float, bool, type(None))
+# base64 of a dill pickle (protocol 2 and up), the untagged format written by earlier versions
+LEGACY_PICKLE_PREFIX: str = "gA"
+
+PATH_KEY_DELIM: Pattern[str] = re.compile(r"(?<!\\)(?:\\\\)*\.|(\[-?\d+\])")
+PATH_LIST_INDEX: Pattern[str] = re.compile(r"^\[-?\d+\]$")
+
+
+class PathToken(NamedTuple):
+    key: Any
+    default_factory: Callable[[], Any]
+
+
+class PathNotFoundError(KeyError):
+    """KeyError for a missing deep_get path; the (expensive) message is only built when displayed."""
+
+    def __init__(self, key: str, dic: Any) -> None:
+        super().__init__(key)
+        self.key: str = key
+        self.dic: Any = dic
+
+    def __str__(self) -> str:
+        try:
+            return f"Spec \"{self.key}\" not found in the dictionary {json.dumps(Utility.serialize(self.dic, None))}"
+        except Exception:  # pylint: disable=broad-except
+            return f"Spec \"{self.key}\" not found in the dictionary {self.dic!r}"
+
+
+def _empty_part_dropped(prev_part: Optional[str], next_part: Optional[str]) -> bool:
+    """Whether pydash drops an empty part between these neighbours, as it does around delimiters and indexes."""
+    if prev_part is not None and next_part is not None:
+        return True
+    return any(neighbour is not None and PATH_LIST_INDEX.match(neighbour) for neighbour in (prev_part, next_part))
+
+
+def _part_kept(prev_part: Optional[str], part: Optional[str], next_part: Optional[str]) -> bool:
+    if part is None:
+        return False
+    return part != "" or not _empty_part_dropped(prev_part, next_part)
+
+
+def _path_token(part: str) -> PathToken:
+    if PATH_LIST_INDEX.match(part):
+        return PathToken(int(part[1:-1]), list)
+    return PathToken(part.replace("\\\\", "\\").replace("\\.", "."), dict)
+
+
+@lru_cache(maxsize=4096)
+def compile_path(path: str) -> Tuple[PathToken, ...]:
+    """Parse a dotted path once, with the same rules as pydash: "\\." escapes a dot, "[n]" is a list index."""
+    if "." not in path and "[" not in path:
+        return (PathToken(path, dict),)
+
+    parts: List[Optional[str]] = [None, *PATH_KEY_DELIM.split(path), None]
+    return tuple(
+        _path_token(cast(str, part))
+        for prev_part, part, next_part in zip(parts, parts[1:], parts[2:])
+        if _part_kept(prev_part, part, next_part)
+    )
+
+
+class LazyValue(ABC):
+    """A value loaded on demand: path lookups step into it, loading only what they reach."""
+
+    @abstractmethod
+    def lookup(self, key: Any) -> Any:
+        """The child at key, itself possibly lazy, or MISSING."""
+
+    @abstractmethod
+    def resolve(self) -> Any:
+        """The whole value."""
+
+
+def _dict_get(obj: Dict[Any, Any], key: Any) -> Any:
+    value: Any = obj.get(key, MISSING)
+    if value is MISSING and not isinstance(key, int):
+        return pydash.get(obj, [key], MISSING)
+    return value
+
+
+def _list_get(obj: List[Any], key: Any) -> Any:
+    try:
+        return obj[key if isinstance(key, int) else int(key)]
+    except (IndexError, ValueError, TypeError):
+        return MISSING
+
+
+def _attribute_get(obj: Any, key: Any) -> Any:
+    try:
+        return pydash.get(obj, [key], MISSING)
+    except KeyError:
+        # restricted (dunder) attribute names
+        return MISSING
+
+
+def path_get(obj: Any, key: Any) -> Any:
+    if isinstance(obj, dict):
+        return _dict_get(obj, key)
+    if isinstance(obj, list):
+        return _list_get(obj, key)
+    if isinstance(obj, LazyValue):
+        return obj.lookup(key)
+    return _attribute_get(obj, key)
+
+
+def _path_child(target: Any, key: Any, default_factory: Callable[[], Any]) -> Any:
+    """The child of target at key, set to default_factory() first if there is none."""
+    if isinstance(target, dict):
+        child: Any = target.get(key, MISSING)
+        if child is MISSING:
+            child = target[key] = default_factory()
+        return child
+    if not pydash.has(target, [key]):
+        pydash.set_(target, [key], default_factory())
+    return pydash.get(target, [key])
+
+
+def path_lookup(obj: Any, path: str) -> Any:
+    """Single pass over a compiled path; returns MISSING if any step is absent."""
+    for token in compile_path(path):
+        obj = path_get(obj, token.key)
+        if obj is MISSING:
+            break
+    if isinstance(obj, LazyValue):
+        return obj.resolve()
+    return obj
 
 
 def root_node(func: Callable[..., Any]) -> Callable[..., Any]:
     @wraps(func)
-    def wrapper(value: Any, key: str, *args: Tuple[Any, ...]) -> Any:
+    def wrapper(value: Any, key: str, *args: Tuple[Any, ...], **kwargs: Any) -> Any:
         return func(
             {"__root__": value},
             f"__root__.{key}" if key else "__root__",
             *args,
+            **kwargs,
         ).get("__root__")
 
     return wrapper
 
 
+@lru_cache(maxsize=16)
+def cached_fernet(encryptkey: str) -> Fernet:
+    """Fernet objects derive their signing and encryption keys on construction; build one per key."""
+    return Fernet(encryptkey.encode("utf-8"))
+
+
 def find_class_instance(class_type: Type[Any], *args: Any, **kwargs: Any) -> Union[Any, None]:
     for arg in args:
         if isinstance(arg, class_type):
@@ -160,18 +308,17 @@ class Utility:  # pylint: disable=too-many-public-methods
 
     @staticmethod
     def deep_del(dic: Dict[str, Any], key: str) -> None:
-        tokens = key.split(".")
-        deep_key = ".".join(tokens[:-1])
-        del_key = tokens[-1]
-        if not deep_key:
-            del dic[del_key]
-        else:
-            obj = Utility.deep_get(dic, deep_key)
-            del obj[del_key]
+        tokens: Tuple[PathToken, ...] = compile_path(key)
+        parent: Any = dic
+        for token in tokens[:-1]:
+            parent = path_get(parent, token.key)
+            if parent is MISSING:
+                raise PathNotFoundError(key, dic)
+        del parent[tokens[-1].key]
 
     @staticmethod
     def deep_has(dic: Union[TypedDictType, Dict[str, Any]], key: str) -> bool:
-        return pydash.has(dic, key)
+        return path_lookup(dic, key) is not MISSING
 
     @staticmethod
     def deep_get(
@@ -179,13 +326,23 @@ class Utility:  # pylint: disable=too-many-public-methods
         key: str,
         default_sentinel: Optional[Any] = object,
     ) -> Any:
-        if not pydash.has(dic, key) and default_sentinel == object:
-            raise KeyError(f"Spec \"{key}\" not found in the dictionary {json.dumps(Utility.serialize(dic, None))}")
-        return pydash.get(dic, key, default_sentinel)
+        value: Any = path_lookup(dic, key)
+        if value is MISSING:
+            if default_sentinel is object:
+                raise PathNotFoundError(key, dic)
+            return default_sentinel
+        return value
 
     @staticmethod
     def deep_set(dic: Union[TypedDictType, Dict[str, Any]], key: str, val: Any) -> None:
-        pydash.set_(dic, key, val)
+        tokens: Tuple[PathToken, ...] = compile_path(key)
+        target: Any = dic
+        for token, following in zip(tokens, tokens[1:]):
+            target = _path_child(target, token.key, following.default_factory)
+        if isinstance(target, dict):
+            target[tokens[-1].key] = val
+        else:
+            pydash.set_(target, [tokens[-1].key], val)
 
     @staticmethod
     def yaml_read(file_name: str) -> Mapping[str, Any]:
@@ -211,7 +368,10 @@ class Utility:  # pylint: disable=too-many-public-methods
 
     @staticmethod
     def safecast(expected_type: type, provided_value: Any) -> Any:
-        ret: Any = provided_value
+        return Utility.safecaster(expected_type)(provided_value)
+
+    @staticmethod
+    def safecaster(expected_type: type) -> Callable[[Any], Any]:
         value_type: Any = get_origin(expected_type) or expected_type
 
         if value_type not in [
@@ -230,12 +390,9 @@ class Utility:  # pylint: disable=too-many-public-methods
             frozenset,
             dict,
         ]:
-            return cast(value_type, provided_value)
-
-        if value_type != inspect.Parameter.empty:
-            ret = value_type(provided_value)
+            return lambda provided_value: cast(value_type, provided_value)
 
-        return ret
+        return cast(Callable[[Any], Any], value_type)
 
     @staticmethod
     def stringify(obj: Any) -> str:
@@ -249,44 +406,90 @@ class Utility:  # pylint: disable=too-many-public-methods
         return cast(JsonType, json.loads(string))
 
     @staticmethod
-    @root_node
-    @traverse_datastructures
-    def serialize(obj: Any, key: Optional[str] = None) -> Any:
-        if type(obj) in [None, bool, int, float, str]:
-            return cast(Union[None, bool, int, float, str], obj)
+    def pickle_value(obj: Any) -> Dict[str, Any]:
+        buffers: List[Any] = []
+        pickled: bytes = dill.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        tagged: Dict[str, Any] = {SERIALIZATION_TAG: "pickle", "data": base64.b64encode(pickled).decode("ascii")}
+        if buffers:
+            tagged["buffers"] = [base64.b64encode(buffer.raw()).decode("ascii") for buffer in buffers]
+        return tagged
+
+    @staticmethod
+    def unpickle_value(tagged: Dict[str, Any]) -> Any:
+        buffers: List[bytes] = [base64.b64decode(buffer) for buffer in tagged.get("buffers", [])]
+        return dill.loads(base64.b64decode(tagged["data"]), buffers=buffers)
 
+    @staticmethod
+    def encode_bytes(obj: Union[bytes, bytearray, memoryview]) -> Dict[str, Any]:
+        return {SERIALIZATION_TAG: type(obj).__name__, "data": base64.b64encode(obj).decode("ascii")}
+
+    @staticmethod
+    def encode_value(obj: Any) -> Any:
+        """The serialized form of a single non JSON-native value."""
+        if type(obj) in (bytes, bytearray, memoryview):
+            return Utility.encode_bytes(obj)
         try:
             return obj.serialize()
         except AttributeError:
             pass
+        return Utility.pickle_value(obj)
 
-        serialized: bytes = dill.dumps(obj)
-        encoded: bytes = base64.b64encode(serialized)
-        utfdecoded: str = encoded.decode("utf-8")
-        return utfdecoded
+    @staticmethod
+    def serialize_value(obj: Any, encode: Optional[Callable[[Any], Any]] = None) -> Any:
+        """obj with every non JSON-native value replaced by its tagged encoding (a pickle by default).
+
+        JSON-native subtrees are returned as they are, not copied.
+        """
+        return VALUE_SERIALIZERS.get(type(obj), _encoded)(obj, encode or Utility.encode_value)
 
     @staticmethod
-    @root_node
-    @traverse_datastructures
-    def deserialize(serialized: str, key: Optional[str] = None) -> Any:
-        if not serialized:
-            return serialized
+    def deserialize_value(obj: Any, decoders: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None) -> Any:
+        """Reverse serialize_value, dispatching on the tag; also reads the untagged legacy format."""
+        deserializer: Callable[[Any, Dict[str, Callable[[Dict[str, Any]], Any]]], Any] = VALUE_DESERIALIZERS.get(
+            type(obj), _unchanged
+        )
+        return deserializer(obj, decoders or TAG_DECODERS)
+
+    @staticmethod
+    def legacy_deserialize(serialized: str) -> Any:
         try:
-            utfencoded: bytes = serialized.encode("utf-8")
-            decoded: bytes = base64.b64decode(utfencoded)
-            deserialized: Any = dill.loads(decoded)
-            return deserialized
+            return dill.loads(base64.b64decode(serialized.encode("utf-8")))
         except (
             binascii.Error,
             dill.UnpicklingError,
             AttributeError,
+            EOFError,
+            ImportError,
+            IndexError,
             MemoryError,
+            TypeError,
+            ValueError,
         ):
             return serialized
 
     @staticmethod
     @root_node
-    def compress(data: Any, key: Optional[str] = None) -> Any:
+    def serialize(obj: Any, key: Optional[str] = None) -> Any:
+        """obj serialized with serialize_value; as in earlier versions, the whole of obj, whatever the key."""
+        return Utility.serialize_value(obj)
+
+    @staticmethod
+    @root_node
+    def deserialize(serialized: Any, key: Optional[str] = None) -> Any:
+        """serialized deserialized with deserialize_value; as in earlier versions, the whole of it, whatever the key."""
+        return Utility.deserialize_value(serialized)
+
+    @staticmethod
+    @root_node
+    def compress(data: Any, key: Optional[str] = None, codec: Optional[str] = None, level: Optional[int] = None) -> Any:
+        """Compress data (or the value at key) with lzma in the legacy format, or with codec as an envelope."""
+        if codec is not None:
+            if not key:
+                return codecs.compress(Envelope.wrap(data), codec, level).encode()
+            compressed: str = codecs.compress(Envelope.wrap(Utility.deep_get(data, key)), codec, level).encode()
+            Utility.deep_set(data, key, compressed)
+            return data
+
         if not key:
             return base64.b64encode(lzma.compress(json.dumps(data).encode("utf-8"))).decode("utf-8")
 
@@ -297,25 +500,31 @@ class Utility:  # pylint: disable=too-many-public-methods
         )
         return data
 
+    @staticmethod
+    def uncompress_value(compressed: str) -> Any:
+        envelope: Optional[Envelope] = Envelope.open(compressed)
+        if envelope is None:
+            return json.loads(lzma.decompress(base64.b64decode(compressed)).decode("utf-8"))
+        if codecs.is_compressed(envelope):
+            envelope = codecs.decompress(envelope)
+        value: Any = envelope.unwrap()
+        return value.encode() if isinstance(value, Envelope) else value
+
     @staticmethod
     @root_node
     def uncompress(data: Any, key: Optional[str] = None) -> Any:
+        """Reverse Utility.compress, whichever codec the data was compressed with."""
         if not key:
-            return json.loads(lzma.decompress(base64.b64decode(data)).decode("utf-8"))
+            return Utility.uncompress_value(data)
 
-        Utility.deep_set(
-            data,
-            key,
-            json.loads(lzma.decompress(base64.b64decode(Utility.deep_get(data, key))).decode("utf-8")),
-        )
+        Utility.deep_set(data, key, Utility.uncompress_value(Utility.deep_get(data, key)))
         return data
 
     @staticmethod
     @root_node
     def encrypt(data: Any, key: str, encryptkey: str) -> Any:
-        key_bytes = encryptkey.encode("utf-8")
         data_bytes = Utility.stringify(Utility.deep_get(data, key)).encode("utf-8")
-        encrypted_bytes = Fernet(key_bytes).encrypt(data_bytes)
+        encrypted_bytes = cached_fernet(encryptkey).encrypt(data_bytes)
         encrypted = encrypted_bytes.decode("utf-8")
         Utility.deep_set(data, key, encrypted)
         return data
@@ -323,9 +532,8 @@ class Utility:  # pylint: disable=too-many-public-methods
     @staticmethod
     @root_node
     def decrypt(encrypted_data: Any, key: str, encryptkey: str) -> Any:
-        key_bytes = encryptkey.encode("utf-8")
         encrypted_bytes = Utility.deep_get(encrypted_data, key).encode("utf-8")
-        decrypted_bytes = Fernet(key_bytes).decrypt(encrypted_bytes)
+        decrypted_bytes = cached_fernet(encryptkey).decrypt(encrypted_bytes)
         decrypted = decrypted_bytes.decode("utf-8")
         Utility.deep_set(encrypted_data, key, Utility.objectify(decrypted))
         return encrypted_data
@@ -341,6 +549,79 @@ class Utility:  # pylint: disable=too-many-public-methods
         return url_safe_key
 
 
+TAG_DECODERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "pickle": Utility.unpickle_value,
+    "bytes": lambda tagged: base64.b64decode(tagged["data"]),
+    "bytearray": lambda tagged: bytearray(base64.b64decode(tagged["data"])),
+    "memoryview": lambda tagged: memoryview(base64.b64decode(tagged["data"])),
+}
+
+
+def _unchanged(obj: Any, _: Any) -> Any:
+    return obj
+
+
+def _encoded(obj: Any, encode: Callable[[Any], Any]) -> Any:
+    return encode(obj)
+
+
+def _same_items(obj: Dict[Any, Any], items: Dict[Any, Any]) -> Dict[Any, Any]:
+    """obj if items holds the same values, so that unchanged subtrees are not copied, otherwise items."""
+    return obj if all(items[key] is val for key, val in obj.items()) else items
+
+
+def _same_members(obj: Union[List[Any], Tuple[Any, ...]], members: List[Any]) -> Any:
+    """obj if members are the same values, otherwise members as obj's type."""
+    return obj if all(member is item for member, item in zip(members, obj)) else type(obj)(members)
+
+
+def _serialize_dict(obj: Dict[Any, Any], encode: Callable[[Any], Any]) -> Any:
+    if SERIALIZATION_TAG in obj or any(type(key) not in JSON_SCALAR_TYPES for key in obj):
+        return Utility.pickle_value(obj)
+    return _same_items(obj, {key: Utility.serialize_value(val, encode) for key, val in obj.items()})
+
+
+def _serialize_sequence(obj: Union[List[Any], Tuple[Any, ...]], encode: Callable[[Any], Any]) -> Any:
+    return _same_members(obj, [Utility.serialize_value(item, encode) for item in obj])
+
+
+def _deserialize_dict(obj: Dict[Any, Any], decoders: Dict[str, Callable[[Dict[str, Any]], Any]]) -> Any:
+    tag: Any = obj.get(SERIALIZATION_TAG)
+    if tag is None:
+        return _same_items(obj, {key: Utility.deserialize_value(val, decoders) for key, val in obj.items()})
+    decoder: Optional[Callable[[Dict[str, Any]], Any]] = decoders.get(tag)
+    if decoder is None:
+        raise ValueError(f"No decoder for serialized values of type '{tag}'")
+    return decoder(obj)
+
+
+def _deserialize_sequence(
+    obj: Union[List[Any], Tuple[Any, ...]], decoders: Dict[str, Callable[[Dict[str, Any]], Any]]
+) -> Any:
+    return _same_members(obj, [Utility.deserialize_value(item, decoders) for item in obj])
+
+
+def _deserialize_str(obj: str, _: Any) -> Any:
+    return Utility.legacy_deserialize(obj) if obj.startswith(LEGACY_PICKLE_PREFIX) else obj
+
+
+# serialize_value by exact type; any other type is encoded
+VALUE_SERIALIZERS: Dict[type, Callable[[Any, Callable[[Any], Any]], Any]] = {
+    **{scalar_type: _unchanged for scalar_type in JSON_SCALAR_TYPES},
+    dict: _serialize_dict,
+    list: _serialize_sequence,
+    tuple: _serialize_sequence,
+}
+
+# deserialize_value by exact type; any other type is returned as it is
+VALUE_DESERIALIZERS: Dict[type, Callable[[Any, Dict[str, Callable[[Dict[str, Any]], Any]]], Any]] = {
+    dict: _deserialize_dict,
+    list: _deserialize_sequence,
+    tuple: _deserialize_sequence,
+    str: _deserialize_str,
+}
+
+
 class DynamicImports:
     def __init__(self, path: str, package_prefix: str):
         self.path = path
@@ -37,6 +37,9 @@ setup(
         "freezegun",
         "line-profiler"
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "hypergo=hypergo.hypergo_click:main"
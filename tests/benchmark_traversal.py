@@ -0,0 +1,63 @@
+"""Microseconds per traversal of sample payloads, recursive vs iterative: python tests/benchmark_traversal.py"""
+import os
+import sys
+import timeit
+from functools import partial
+from typing import Any, Callable, Dict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.traversal import traverse
+from test_traversal import recursive_traverse
+
+
+def identity(value: Any) -> Any:
+    return value
+
+
+def upper(value: Any) -> Any:
+    return value.upper() if isinstance(value, str) and value.startswith("{") else value
+
+
+def literal(node: Any) -> bool:
+    return isinstance(node, str) and "{" not in node
+
+
+def micros(func: Callable[[], Any], number: int) -> float:
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def benchmark(number: int = 200) -> Dict[str, Dict[str, float]]:
+    record: Dict[str, Any] = {
+        "id": 1,
+        "name": "record",
+        "tags": ["a", "b", "c"],
+        "address": {"street": "Main", "city": "Springfield", "geo": [1.5, 2.5]},
+        "friends": [{"id": index, "name": f"friend {index}"} for index in range(10)],
+        "template": "{message.body}",
+    }
+    payloads: Dict[str, Any] = {"record": record, "records": [record] * 100}
+    results: Dict[str, Dict[str, float]] = {}
+    for name, payload in payloads.items():
+        for func_name, func in [("identity", identity), ("substitute", upper)]:
+            results[f"{name}/{func_name}"] = {
+                "recursive": micros(partial(recursive_traverse(func), payload), number),
+                "iterative": micros(partial(traverse, payload, func), number),
+                "pruned": micros(partial(traverse, payload, func, literal), number),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    for case, timings in benchmark().items():
+        print(f"{case:22s} " + "  ".join(f"{impl} {value:9.1f}us" for impl, value in timings.items()))
+    deep: Any = "leaf"
+    for _ in range(sys.getrecursionlimit() * 2):
+        deep = [deep]
+    try:
+        recursive_traverse(identity)(deep)
+        print("recursive: deep nesting ok")
+    except RecursionError:
+        print("recursive: RecursionError on deep nesting")
+    print(f"iterative: deep nesting {'ok' if traverse(deep, identity) is deep else 'changed'}")
@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.buffers import BufferCodec
+from hypergo.storage import Storage
+from hypergo.transform import Transform
+from hypergo.utility import SERIALIZATION_TAG, Utility
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class DirectoryStorage(Storage):
+    def __init__(self, root: str) -> None:
+        self.root: str = root
+
+    def load(self, file_name: str) -> str:
+        with open(os.path.join(self.root, file_name), "r", encoding="utf-8") as file:
+            return file.read()
+
+    def save(self, file_name: str, content: str) -> None:
+        self.save_bytes(file_name, content.encode("utf-8"))
+
+    def load_bytes(self, file_name: str) -> bytes:
+        with open(os.path.join(self.root, file_name), "rb") as file:
+            return file.read()
+
+    def save_bytes(self, file_name: str, content: bytes) -> None:
+        path: str = os.path.join(self.root, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(content)
+
+    def exists(self, file_name: str) -> bool:
+        return os.path.isfile(os.path.join(self.root, file_name))
+
+    def local_path(self, file_name: str) -> Any:
+        return os.path.join(self.root, file_name) if self.exists(file_name) else None
+
+
+class TestBufferCodec(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.storage: Storage = DirectoryStorage(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def round_trip(self, value: Any, threshold: int = 16) -> Dict[str, Any]:
+        serialized: Dict[str, Any] = Transform.serialize({"body": value}, "body", self.storage, threshold)
+        self.assertIsInstance(serialized["body"], dict)
+        return serialized
+
+    def test_bytes(self) -> None:
+        for value in [b"short", b"x" * 100]:
+            serialized: Dict[str, Any] = self.round_trip(value)
+            self.assertEqual(serialized["body"][SERIALIZATION_TAG], "bytes")
+            self.assertEqual("file" in serialized["body"], len(value) > 16)
+            self.assertEqual(Transform.deserialize(serialized, "body", self.storage), {"body": value})
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_small_array_inline(self) -> None:
+        array: Any = numpy.arange(6, dtype="<f4").reshape(2, 3)
+        serialized: Dict[str, Any] = self.round_trip(array, threshold=1024)
+        self.assertEqual(serialized["body"]["shape"], [2, 3])
+        self.assertNotIn("file", serialized["body"])
+        restored: Any = Utility.deserialize(serialized, "body")["body"]
+        numpy.testing.assert_array_equal(restored, array)
+        self.assertEqual(restored.dtype, array.dtype)
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_large_array_is_memory_mapped(self) -> None:
+        array: Any = numpy.arange(1000, dtype="<i8")
+        serialized: Dict[str, Any] = self.round_trip(array)
+        self.assertTrue(serialized["body"]["file"].endswith(".npy"))
+        restored: Any = Transform.deserialize(serialized, "body", self.storage)["body"]
+        self.assertIsInstance(restored, numpy.memmap)
+        numpy.testing.assert_array_equal(restored, array)
+
+    def test_without_storage_buffers_stay_inline(self) -> None:
+        serialized: Dict[str, Any] = Utility.serialize_value(b"x" * 100, BufferCodec(None, 16).encode)
+        self.assertEqual(Utility.deserialize_value(serialized), b"x" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import unittest
+from typing import Any, Dict, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.content_store import READ_CACHE, ContentStore, ReadCache
+from hypergo.transform import Transform
+from hypergo.utility import Utility
+from test_storage import MemoryStorage
+
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: MemoryStorage = MemoryStorage()
+
+    def test_dedup_skips_redundant_writes(self) -> None:
+        store: ContentStore = ContentStore(self.storage)
+        keys: List[str] = [store.put('{"a": 1}') for _ in range(3)]
+        self.assertEqual(len(set(keys)), 1)
+        self.assertEqual(self.storage.saves, keys[:1])
+        self.assertEqual(store.stats["hits"], 2)
+        self.assertEqual(store.stats["misses"], 1)
+
+    def test_existing_blobs_are_found_in_storage(self) -> None:
+        ContentStore(self.storage).put("body")
+        store: ContentStore = ContentStore(self.storage)
+        store.put("body")
+        self.assertEqual(len(self.storage.saves), 1)
+        self.assertEqual(store.stats["hits"], 1)
+
+    def test_keys(self) -> None:
+        store: ContentStore = ContentStore(self.storage)
+        self.assertEqual(store.key("body"), f"storagekey_{Utility.hash('body')}")
+        self.assertEqual(len(store.key("body", "blake2b")), len(store.key("body")))
+        with self.assertRaises(ValueError):
+            store.key("body", "sha1")
+
+    def test_storebyreference_dedup(self) -> None:
+        for _ in range(2):
+            stored: Dict[str, str] = Transform.storebyreference(
+                {"body": {"a": 1}}, "body", self.storage, dedup=True, digest="blake2b"
+            )
+        self.assertEqual(self.storage.saves, [os.path.join("passbyreference", stored["body"])])
+        self.assertEqual(Transform.fetchbyreference(stored, "body", self.storage), {"body": {"a": 1}})
+        self.assertEqual(ContentStore.for_storage(self.storage).stats["hits"], 1)
+
+    def test_chunked_records(self) -> None:
+        store: ContentStore = ContentStore(self.storage)
+        records: List[Dict[str, int]] = [{"index": index} for index in range(100)]
+        key: str = store.put_chunked(iter(records), chunk_size=64)
+        self.assertTrue(store.is_key(key) and ContentStore.is_chunked(key))
+        manifest: Dict[str, Any] = store.manifest(key)
+        self.assertEqual(manifest["format"], "records")
+        self.assertGreater(len(manifest["chunks"]), 10)
+        self.assertTrue(all(len(store.load(chunk)) < 64 + 16 for chunk in manifest["chunks"]))
+        self.assertEqual(list(store.iter_records(key)), records)
+        self.assertEqual(store.load_chunked(key), records)
+
+    def test_chunked_document(self) -> None:
+        store: ContentStore = ContentStore(self.storage)
+        document: Dict[str, Any] = {"text": "x" * 1000, "items": list(range(100))}
+        key: str = store.put_chunked(document, chunk_size=100)
+        self.assertEqual(store.manifest(key)["format"], "json")
+        self.assertEqual(store.load_chunked(key), document)
+        self.assertEqual(list(store.iter_records(key)), [document])
+
+    def test_fetchbyreference_stream(self) -> None:
+        records: List[Dict[str, int]] = [{"index": index} for index in range(10)]
+        stored: Dict[str, str] = Transform.storebyreference({"body": records}, "body", self.storage, chunked=True)
+        streamed: Dict[str, Any] = Transform.fetchbyreference(dict(stored), "body", self.storage, stream=True)
+        self.assertNotIsInstance(streamed["body"], list)
+        self.assertEqual(list(streamed["body"]), records)
+        self.assertEqual(Transform.fetchbyreference(dict(stored), "body", self.storage), {"body": records})
+
+
+class TestReadCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loads: List[str] = []
+
+    def load(self, key: str) -> str:
+        self.loads.append(key)
+        return '{"key": "%s", "items": [1, 2, 3]}' % key
+
+    def test_hits_return_private_copies(self) -> None:
+        cache: ReadCache = ReadCache()
+        first: Any = cache.parsed("a", self.load)
+        first["items"].append(4)
+        second: Any = cache.parsed("a", self.load)
+        self.assertEqual(second, {"key": "a", "items": [1, 2, 3]})
+        self.assertIsNot(cache.parsed("a", self.load), second)
+        self.assertEqual(cache.raw("a", self.load), self.load("a"))
+        self.assertEqual(self.loads, ["a", "a"])
+        self.assertEqual(cache.stats["hits"], 3)
+
+    def test_byte_bound_evicts_least_recently_used(self) -> None:
+        cache: ReadCache = ReadCache(max_bytes=200)
+        for key in ["a", "b", "c", "a", "d"]:
+            cache.parsed(key, self.load)
+        self.assertLessEqual(cache.stats["bytes"], 200)
+        self.assertGreater(cache.stats["evictions"], 0)
+        self.assertEqual(cache.stats["misses"] + cache.stats["hits"], 5)
+
+    def test_fetchbyreference_cache(self) -> None:
+        storage: MemoryStorage = MemoryStorage()
+        stored: Dict[str, str] = Transform.storebyreference({"body": {"a": 1}}, "body", storage)
+        READ_CACHE.clear()
+        for _ in range(2):
+            fetched: Dict[str, Any] = Transform.fetchbyreference(dict(stored), "body", storage, cache=True)
+            self.assertEqual(fetched, {"body": {"a": 1}})
+        storage.files.clear()
+        self.assertEqual(Transform.fetchbyreference(dict(stored), "body", storage, cache=True), {"body": {"a": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.config import ConfigType
+from hypergo.content_store import ContentStore
+from hypergo.executor import Executor
+from hypergo.executor_cache import ExecutorCache
+from hypergo.keyring import KeyRing
+from hypergo.local_storage import LocalStorage
+from hypergo.secrets import LocalSecrets
+from hypergo.storage import Storage
+from test_storage import MemoryStorage, get_config
+
+# the input is bound through custom_properties, substituted anew on every call
+FIELDS: Dict[str, Any] = {
+    "input_keys": ["a.b"],
+    "output_keys": ["x.?"],
+    "input_bindings": ["{config.custom_properties.value}"],
+    "custom_properties": {"value": "{message.body.value}"},
+}
+
+
+class TestExecutorCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: Storage = MemoryStorage()
+
+    def test_reuses_executor_for_same_config(self) -> None:
+        cache: ExecutorCache = ExecutorCache()
+        first: Executor = cache.get(get_config(**FIELDS), storage=self.storage)
+        second: Executor = cache.get(get_config(**FIELDS), storage=self.storage)
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_distinct_collaborators_rebind_the_cached_executor(self) -> None:
+        cache: ExecutorCache = ExecutorCache()
+        config: ConfigType = get_config(**FIELDS)
+        first: Executor = cache.get(config, storage=self.storage)
+        for _ in range(3):
+            storage: Storage = MemoryStorage()
+            second: Executor = cache.get(config, storage=storage)
+            self.assertIsNot(second, first)
+            self.assertIs(second.storage, storage)
+            self.assertIs(second.routing, first.routing)
+        self.assertIs(first.storage, self.storage)
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["size"], 1)
+
+    def test_rebinding_to_fresh_collaborators_keeps_their_caches(self) -> None:
+        root: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        cache: ExecutorCache = ExecutorCache()
+        config: ConfigType = get_config(**FIELDS)
+        storages: List[Storage] = [LocalStorage(root), LocalStorage(root)]
+        first: Executor = cache.get(config, storage=storages[0], secrets=LocalSecrets())
+        second: Executor = cache.get(config, storage=storages[1], secrets=LocalSecrets())
+        self.assertIsNot(second, first)
+        self.assertIs(ContentStore.for_storage(storages[1]), ContentStore.for_storage(storages[0]))
+        self.assertIs(KeyRing.for_secrets(second.secrets), KeyRing.for_secrets(first.secrets))
+        self.assertIs(second.transforms.table["encryption"][0][1], first.transforms.table["encryption"][0][1])
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache: ExecutorCache = ExecutorCache(maxsize=2)
+        first: Executor = cache.get(get_config(name="one", **FIELDS), storage=self.storage)
+        cache.get(get_config(name="two", **FIELDS), storage=self.storage)
+        cache.get(get_config(name="one", **FIELDS), storage=self.storage)
+        cache.get(get_config(name="three", **FIELDS), storage=self.storage)
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertEqual(cache.stats["size"], 2)
+        self.assertIs(cache.get(get_config(name="one", **FIELDS), storage=self.storage), first)
+        self.assertEqual(cache.stats["misses"], 3)
+
+    def test_reused_executor_does_not_leak_substitutions(self) -> None:
+        executor: Executor = ExecutorCache().get(get_config(**FIELDS), storage=self.storage)
+        for value in ["first", "second"]:
+            outputs = list(executor.execute({"routingkey": "a.b.c", "body": {"value": value}}))
+            self.assertEqual(outputs[0]["body"], value)
+            self.assertEqual(outputs[0]["routingkey"], "c.x")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from typing import List
+from unittest import mock
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo import codecs
+from hypergo.content_store import ContentStore
+from hypergo.hypergo_cli import HypergoCli
+from hypergo.local_storage import ROOT_VARIABLE, LocalStorage
+
+
+class TestHypergoCli(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root: str = tempfile.mkdtemp()
+        self.storage: LocalStorage = LocalStorage(self.root)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+
+    def test_samples_read_only_stored_blobs(self) -> None:
+        store: ContentStore = ContentStore(self.storage.use_sub_path("passbyreference"))
+        records: List[str] = [
+            store.put_indexed({"customer": {"name": f"name {i}", "region": "north"}}) for i in range(3)
+        ]
+        self.storage.save_if_version("passbyreference/versioned", "{}", None)
+        self.storage.save_bytes("buffers/buffer.npy", b"\x93NUMPY\xff\xfe")
+
+        samples: List[bytes] = list(HypergoCli.samples([self.root]))
+        self.assertEqual(len(samples), len(records))
+        self.assertEqual(
+            sorted(samples), sorted(json.dumps(json.loads(store.load(key))).encode("utf-8") for key in records)
+        )
+
+    def test_dictionary_from_storage_directory(self) -> None:
+        store: ContentStore = ContentStore(self.storage.use_sub_path("passbyreference"))
+        for i in range(3):
+            store.put_indexed({"customer": {"name": f"name {i}", "region": "north"}})
+        self.storage.save_bytes("buffers/buffer.npy", b"\x93NUMPY\xff\xfe")
+
+        output: io.StringIO = io.StringIO()
+        with mock.patch.dict(os.environ, {ROOT_VARIABLE: self.root}), redirect_stdout(output):
+            self.assertEqual(HypergoCli().dictionary(self.root), 0)
+        dictionary_id: str = output.getvalue().split()[0]
+        zdict: bytes = codecs.Dictionaries(self.storage.use_sub_path("dictionaries")).load(dictionary_id)
+        self.assertIn(b"region", zdict)
+
+
+if __name__ == "__main__":
+    unittest.main()
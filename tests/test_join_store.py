@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import unittest
+from typing import Any, Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.join_store import JoinOptions, JoinStore
+from hypergo.standard_components.transaction_manager.__main__ import converge, join
+from hypergo.transaction import Transaction
+from test_storage import MemoryStorage
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestJoinStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: MemoryStorage = MemoryStorage()
+        self.input_keys: List[str] = ["a.b.c", "x.y.z"]
+
+    def test_same_output_as_converge(self) -> None:
+        transaction: Transaction = Transaction()
+        self.assertIsNone(join(self.input_keys, "a.b.c", "First", transaction, self.storage))
+        self.assertIsNone(converge(self.input_keys, "a.b.c", "First", transaction))
+        expected: Optional[Dict[str, Any]] = converge(self.input_keys, "x.y.z", {"n": [1]}, transaction)
+        self.assertEqual(join(self.input_keys, "x.y.z", {"n": [1]}, transaction, self.storage), expected)
+        # a completed join keeps only its record, which ignores a redelivered input until it expires
+        registry: str = JoinStore(self.storage, self.input_keys).registry_key(transaction.txid)
+        self.assertEqual(list(self.storage.files), [f"join_{transaction.txid}", registry])
+        self.assertIsNone(join(self.input_keys, "x.y.z", {"n": [1]}, transaction, self.storage))
+        self.assertEqual(list(self.storage.files), [f"join_{transaction.txid}", registry])
+        self.assertEqual(JoinStore(self.storage, self.input_keys).pending(), {})
+
+    def test_redelivered_input_replaces_its_payload(self) -> None:
+        store: JoinStore = JoinStore(self.storage, self.input_keys)
+        store.arrive("tx", "a.b.c", "first")
+        store.arrive("tx", "a.b.c", "again")
+        self.assertEqual(len([name for name in self.storage.files if name.startswith("join_tx_")]), 1)
+        self.assertEqual(store.arrive("tx", "x.y.z", 2), {"a.b.c": "again", "x.y.z": 2})
+
+    def test_options_bound_with_the_input_keys(self) -> None:
+        spec: Dict[str, Any] = {"input_keys": self.input_keys, "ttl": 10, "shards": 1}
+        transaction: Transaction = Transaction()
+        self.assertIsNone(join(spec, "a.b.c", 1, transaction, self.storage))
+        store: JoinStore = JoinStore(self.storage, self.input_keys, JoinOptions(shards=1))
+        self.assertEqual(list(store.pending()), [transaction.txid])
+        self.assertEqual(join(spec, "x.y.z", 2, transaction, self.storage), {"a.b.c": 1, "x.y.z": 2})
+
+    def test_routing_keys_with_extra_tokens(self) -> None:
+        store: JoinStore = JoinStore(self.storage, ["a", "a.b"])
+        self.assertEqual(store.index("a.x"), 0)
+        self.assertEqual(store.index("b.a.x"), 1)
+        self.assertIsNone(store.index("c"))
+
+    def test_expiry(self) -> None:
+        clock: Clock = Clock()
+        store: JoinStore = JoinStore(self.storage, self.input_keys, JoinOptions(ttl=10, shards=1), clock)
+        store.arrive("tx1", "a.b.c", 1)
+        clock.now += 11
+        self.assertIsNone(store.arrive("tx1", "x.y.z", 2))
+        store.arrive("tx2", "a.b.c", 1)
+        self.assertEqual(list(store.pending()), ["tx1", "tx2"])
+        clock.now += 11
+        store.arrive("tx3", "a.b.c", 1)
+        self.assertEqual(list(store.pending()), ["tx3"])
+        self.assertNotIn("join_tx1", self.storage.files)
+        self.assertEqual([name for name in self.storage.files if name.startswith("join_tx2")], [])
+
+    def test_caps(self) -> None:
+        clock: Clock = Clock()
+        store: JoinStore = JoinStore(self.storage, self.input_keys, JoinOptions(max_pending=2, shards=1), clock)
+        for txid in ["tx1", "tx2", "tx3"]:
+            clock.now += 1
+            store.arrive(txid, "a.b.c", "x" * 100)
+        self.assertEqual(list(store.pending()), ["tx2", "tx3"])
+        self.assertEqual([name for name in self.storage.files if name.startswith("join_tx1")], [])
+
+        store = JoinStore(self.storage, self.input_keys, JoinOptions(max_bytes=500, shards=1), clock)
+        store.arrive("tx4", "a.b.c", "x" * 100)
+        self.assertEqual(list(store.pending()), ["tx3", "tx4"])
+
+    def test_completed_joins_count_toward_caps(self) -> None:
+        clock: Clock = Clock()
+        store: JoinStore = JoinStore(self.storage, self.input_keys, JoinOptions(max_pending=2, shards=1), clock)
+        clock.now += 1
+        store.arrive("tx1", "a.b.c", 1)
+        self.assertEqual(store.arrive("tx1", "x.y.z", 2), {"a.b.c": 1, "x.y.z": 2})
+        for txid in ["tx2", "tx3"]:
+            clock.now += 1
+            store.arrive(txid, "a.b.c", 1)
+        # the completed join expired first, so it is the one dropped
+        self.assertNotIn("join_tx1", self.storage.files)
+        self.assertEqual(list(store.pending()), ["tx2", "tx3"])
+
+    def test_shards(self) -> None:
+        store: JoinStore = JoinStore(self.storage, self.input_keys, JoinOptions(shards=4))
+        txids: List[str] = [f"tx{i}" for i in range(20)]
+        for txid in txids:
+            store.arrive(txid, "a.b.c", 1)
+        registries: List[str] = sorted(name for name in self.storage.files if name.startswith("joins_pending_"))
+        self.assertEqual(registries, [f"joins_pending_{shard}" for shard in range(4)])
+        self.assertEqual(sorted(store.pending()), sorted(txids))
+
+    def test_concurrent_arrivals_complete_once(self) -> None:
+        input_keys: List[str] = [f"branch.{branch}" for branch in range(8)]
+        store: JoinStore = JoinStore(self.storage, input_keys)
+        barrier: threading.Barrier = threading.Barrier(len(input_keys))
+        results: List[Optional[Dict[str, Any]]] = []
+
+        def branch(routingkey: str) -> None:
+            barrier.wait()
+            results.append(store.arrive("tx", routingkey, routingkey))
+
+        threads: List[threading.Thread] = [threading.Thread(target=branch, args=(rk,)) for rk in input_keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([result for result in results if result], [{rk: rk for rk in input_keys}])
+
+
+if __name__ == "__main__":
+    unittest.main()
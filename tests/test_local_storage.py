@@ -1,23 +1,47 @@
 import os
+import shutil
 import sys
+import tempfile
+import threading
 import unittest
+from unittest import mock
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
-from hypergo.storage import Storage
-from hypergo.local_storage import LocalStorage
+from hypergo.local_storage import ROOT_VARIABLE, LocalStorage
 
 
 class TestLocalStorage(unittest.TestCase):
     def setUp(self) -> None:
-        self.storage: Storage = LocalStorage()
+        self.root: str = tempfile.mkdtemp()
+        self.storage: LocalStorage = LocalStorage(self.root)
         self.file_name: str = "test.txt"
-        self.file_path = os.path.join(os.path.expanduser('~'), '.hypergo_storage', self.file_name)
+        self.file_path = self.storage.path(self.file_name)
+
+    def test_load_flat_layout(self) -> None:
+        content: str = "Hello, world!"
+        with open(os.path.join(self.root, self.file_name), "w", encoding="utf-8") as fp:
+            fp.write(content)
+        self.assertEqual(self.storage.load(self.file_name), content)
+        self.assertTrue(self.storage.exists(self.file_name))
+        self.storage.save(self.file_name, "Goodbye")
+        self.assertEqual(self.storage.load(self.file_name), "Goodbye")
+
+    def test_sharded_layout(self) -> None:
+        self.storage.save("sub/storagekey_1", "one")
+        path: str = os.path.relpath(self.storage.path("sub/storagekey_1"), self.root)
+        self.assertEqual(len(path.split(os.sep)), 4)
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path("sub/storagekey_1"))), ["storagekey_1"])
+
+    def test_root_from_environment(self) -> None:
+        with mock.patch.dict(os.environ, {ROOT_VARIABLE: self.root}):
+            self.assertEqual(LocalStorage().root, self.root)
 
     def test_load(self) -> None:
         content: str = "Hello, world!"
+        os.makedirs(os.path.dirname(self.file_path))
         with open(self.file_path, "w", encoding="utf-8") as fp:
             fp.write(content)
         result: str = self.storage.load(self.file_name)
@@ -30,9 +54,55 @@ class TestLocalStorage(unittest.TestCase):
             result: str = fp.read()
         self.assertEqual(result, content)
 
+    def test_load_range(self) -> None:
+        self.storage.save(self.file_name, "Hello, world!")
+        self.assertEqual(self.storage.load_range(self.file_name, 7, 12), "world")
+
+    def test_exists(self) -> None:
+        self.assertFalse(self.storage.exists(self.file_name))
+        self.storage.save(self.file_name, "Hello, world!")
+        self.assertTrue(self.storage.exists(self.file_name))
+
+    def test_save_if_version(self) -> None:
+        self.assertEqual(self.storage.load_versioned(self.file_name), (None, None))
+        version = self.storage.save_if_version(self.file_name, "one", None)
+        self.assertIsNone(self.storage.save_if_version(self.file_name, "two", None))
+        self.assertEqual(self.storage.load_versioned(self.file_name), ("one", version))
+        self.assertIsNotNone(self.storage.save_if_version(self.file_name, "two", version))
+        self.assertIsNone(self.storage.save_if_version(self.file_name, "three", version))
+        self.assertEqual(self.storage.load(self.file_name), "two")
+
+    def test_versioned_files_leave_nothing_behind(self) -> None:
+        version = self.storage.save_if_version(self.file_name, "one", None)
+        self.storage.save_if_version(self.file_name, "two", version)
+        directory: str = os.path.dirname(self.file_path)
+        self.assertEqual(os.listdir(directory), [self.file_name])
+        self.storage.delete(self.file_name)
+        self.assertEqual(os.listdir(directory), [])
+        self.assertIsNotNone(self.storage.save_if_version(self.file_name, "three", None))
+
+    def test_failed_write_removes_temporary_file(self) -> None:
+        self.storage.save(self.file_name, "one")
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.storage.save(self.file_name, "two")
+        self.assertEqual(os.listdir(os.path.dirname(self.file_path)), [self.file_name])
+        self.assertEqual(self.storage.load(self.file_name), "one")
+
+    def test_concurrent_updates(self) -> None:
+        def increment() -> None:
+            for _ in range(10):
+                self.storage.update(self.file_name, lambda content: str(int(content or 0) + 1), attempts=1000)
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.storage.load(self.file_name), "40")
+
     def tearDown(self) -> None:
-        if os.path.exists(self.file_path):
-            os.remove(self.file_path)
+        shutil.rmtree(self.root)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.routing import RoutingKeyEngine
+
+
+class TestRoutingKeyEngine(unittest.TestCase):
+    def test_output_routing_key(self) -> None:
+        engine: RoutingKeyEngine = RoutingKeyEngine(["a.b.c", "a.b.d", "a.b", "a"], ["y.h.?.?"])
+        self.assertEqual(engine.output_routing_key("a.b.c.x"), "b.c.h.x.y")
+        self.assertEqual(engine.output_routing_key("a.b.d"), ".b.d.h.y")
+
+    def test_unmatched_routing_key(self) -> None:
+        engine: RoutingKeyEngine = RoutingKeyEngine(["link.db.query"], ["?.db.result.link.json"])
+        self.assertEqual(engine.output_routing_key("link.db.query.specleasing"), "db.json.link.result.specleasing")
+        self.assertEqual(engine.output_routing_key("other.key"), ".db.json.link.result")
+
+    def test_cache_statistics(self) -> None:
+        engine: RoutingKeyEngine = RoutingKeyEngine(["a"], ["b.?"])
+        for _ in range(3):
+            engine.output_routing_key("a.c")
+        engine.output_routing_key("a.d")
+        self.assertEqual(engine.stats["hits"], 2)
+        self.assertEqual(engine.stats["misses"], 2)
+        self.assertEqual(engine.stats["hit_rate"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import unittest
+from typing import Any, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.config import ConfigType
+from hypergo.executor import Executor
+from hypergo.message import MessageType
+from hypergo.transaction_log import TransactionLog
+from test_storage import MemoryStorage, get_config
+
+
+def component(lib_func: str, input_bindings: List[str]) -> ConfigType:
+    return get_config(
+        name=lib_func,
+        lib_func=f"hypergo.standard_components.scatter_gather.__main__.{lib_func}",
+        output_keys=["b"],
+        input_bindings=input_bindings,
+    )
+
+
+class TestScatterGather(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: MemoryStorage = MemoryStorage()
+        TransactionLog._states.clear()
+
+    def scatter(self, body: Any, input_bindings: List[str]) -> List[MessageType]:
+        executor: Executor = Executor(component("scatter", input_bindings), storage=self.storage)
+        return list(executor.execute({"routingkey": "a", "body": body}))
+
+    def test_scatter_and_gather_concurrently(self) -> None:
+        shards: List[MessageType] = self.scatter(list(range(100)), ["{message.body}", "{transaction}"])
+        self.assertEqual([shard["body"] for shard in shards], list(range(100)))
+        self.assertEqual(len({shard["transaction"] for shard in shards}), 1)
+
+        gather: Executor = Executor(component("gather", ["{message.body}", "{transaction}"]), storage=self.storage)
+        results: List[Any] = []
+        barrier: threading.Barrier = threading.Barrier(4)
+
+        def worker(mine: List[MessageType]) -> None:
+            barrier.wait()
+            for shard in mine:
+                results.extend(message["body"] for message in gather.execute(shard))
+
+        threads: List[threading.Thread] = [threading.Thread(target=worker, args=(shards[i::4],)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([result for result in results if result is not None], [sum(range(100))])
+
+    def test_shard_size_and_reducer(self) -> None:
+        shards: List[MessageType] = self.scatter(["a", "b", "c"], ["{message.body}", "{transaction}", 2])
+        self.assertEqual([shard["body"] for shard in shards], [["a", "b"], ["c"]])
+
+        config: ConfigType = component("gather", ["{message.body}", "{transaction}", "operator.add"])
+        gather: Executor = Executor(config, storage=self.storage)
+        results: List[Any] = [message["body"] for shard in reversed(shards) for message in gather.execute(shard)]
+        self.assertEqual(results, [None, ["c", "a", "b"]])
+
+    def test_empty_body(self) -> None:
+        self.assertEqual(self.scatter([], ["{message.body}", "{transaction}"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
-from typing import Any
+from typing import Any, Dict, List, Optional
 
+from hypergo.config import ConfigType
 from hypergo.storage import Storage, SubStorage
 
 
@@ -49,5 +50,52 @@ class StorageMock(Storage):
         self.saved_files[file_name] = content
 
 
+class MemoryStorage(Storage):
+    """A Storage in a dict, recording the names loaded and saved."""
+
+    def __init__(self) -> None:
+        self.files: Dict[str, str] = {}
+        self.loads: List[str] = []
+        self.saves: List[str] = []
+
+    def load(self, file_name: str) -> str:
+        self.loads.append(file_name)
+        return self.files[file_name]
+
+    def load_range(self, file_name: str, start: int, end: int) -> str:
+        return self.files[file_name][start:end]
+
+    def exists(self, file_name: str) -> bool:
+        return file_name in self.files
+
+    def save(self, file_name: str, content: str) -> None:
+        self.saves.append(file_name)
+        self.files[file_name] = content
+
+    def delete(self, file_name: str) -> None:
+        self.files.pop(file_name, None)
+
+
+def get_config(
+    input_operations: Optional[Dict[str, Any]] = None, output_operations: Optional[Dict[str, Any]] = None, **fields: Any
+) -> ConfigType:
+    """A passthrough component config, with fields replacing its defaults."""
+    config: ConfigType = {
+        "version": "2.0.0",
+        "namespace": "datalink",
+        "name": "passthrough",
+        "package": "hypergo",
+        "lib_func": "hypergo.standard_components.pipeline_orchestrator.__main__.pass_message",
+        "input_keys": ["a"],
+        "output_keys": ["b.?"],
+        "input_bindings": ["{message.body}"],
+        "output_bindings": ["message.body"],
+        "input_operations": input_operations or {},
+        "output_operations": output_operations or {},
+    }
+    config.update(fields)
+    return config
+
+
 if __name__ == '__main__':
     unittest.main()
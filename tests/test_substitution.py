@@ -0,0 +1,113 @@
+import copy
+import gc
+import os
+import sys
+import unittest
+from typing import Any, Dict, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.substitution import (KEY_INDEXES, BindingPlan, ConfigTemplate,
+                                  KeyIndex, compile_binding, do_substitution,
+                                  find_best_key)
+
+
+class TestSubstitution(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data: Dict[str, Any] = {
+            "message": {
+                "routingkey": "link.db.query.specleasing.scheduled.select_query",
+                "body": {"name": "Chris", "count": 3, "nested": {"template": "{config.name}"}},
+            },
+            "config": {
+                "name": "component",
+                "indirect": "{message.body.name}",
+                "custom_properties": {
+                    "specleasing.select_query": "SELECT 1;",
+                    "specleasing": "SELECT 2;",
+                    "other.select_query": "SELECT 3;",
+                },
+            },
+        }
+
+    def test_compiled_bindings_match_do_substitution(self) -> None:
+        bindings = [
+            "{message.body.name}",
+            "{message.body}",
+            "{message.body.missing}",
+            "{config.indirect}",
+            "{config.custom_properties.?}",
+            "hello {message.body.name}, you have {message.body.count}",
+            "{config.name}-{config.missing}",
+            "plain literal",
+            None,
+            42,
+            ["{message.body.count}", {"{config.name}": "{message.body.name}"}],
+            ("{config.name}", "literal"),
+        ]
+        for binding in bindings:
+            with self.subTest(binding=binding):
+                self.assertEqual(compile_binding(binding)(self.data), do_substitution(binding, self.data))
+
+    def test_binding_plan_casts_arguments(self) -> None:
+        bindings: List[str] = ["{message.body.count}", "{message.body.name}", "{message.body}"]
+        plan: BindingPlan = BindingPlan(bindings, [str, Any, dict])
+        self.assertEqual(plan.apply(self.data), ["3", "Chris", self.data["message"]["body"]])
+
+    def test_compiled_containers_are_not_shared_between_messages(self) -> None:
+        binding = compile_binding(["literal"])
+        self.assertIsNot(binding(self.data), binding(self.data))
+
+    def test_config_snapshot_matches_full_substitution(self) -> None:
+        config: Dict[str, Any] = {
+            "name": "component",
+            "input_bindings": ["{message.body.name}"],
+            "output_keys": ["{config.name}.out", "static.out"],
+            "custom_properties": {
+                "greeting": "hello {message.body.name}",
+                "label": "{config.name}",
+                "query": "{config.custom_properties.?}",
+                "specleasing": "SELECT 2;",
+            },
+            "static": {"deep": ["a", "b"]},
+        }
+        pristine: Dict[str, Any] = copy.deepcopy(config)
+        template: ConfigTemplate = ConfigTemplate(config)
+        data: Dict[str, Any] = {"config": config, "message": self.data["message"]}
+
+        snapshot: Dict[str, Any] = template.snapshot(data)
+        expected: Dict[str, Any] = do_substitution(config, data)
+        expected["input_bindings"] = config["input_bindings"]
+        self.assertEqual(snapshot, expected)
+        self.assertEqual(config, pristine)
+        self.assertIs(snapshot["static"], config["static"])
+        self.assertIs(snapshot["input_bindings"], config["input_bindings"])
+        self.assertEqual(
+            sorted(template.dynamic_paths), [("custom_properties", "greeting"), ("custom_properties", "query")]
+        )
+
+    def test_key_index_matches_linear_scan(self) -> None:
+        node: Dict[str, Any] = {"a": 1, "a.b": 2, "b.a": 3, "a.b.c": 4, "c": 5, "": 6}
+        routing_keys = ["a.b.x", "b.a", "c.a.b", "x.y", "x..y", "c.d"]
+        mutations = [lambda: None, lambda: node.pop("a.b"), lambda: node.update({"a.b": 7}), lambda: node.pop("a.b.c")]
+        for mutate in mutations:
+            mutate()
+            index: KeyIndex = KeyIndex(node)
+            for routing_key in routing_keys:
+                with self.subTest(keys=list(node), routing_key=routing_key):
+                    self.assertEqual(index.best_key(routing_key), find_best_key(node, routing_key))
+
+    def test_config_dicts_are_indexed_while_their_template_lives(self) -> None:
+        routes: Dict[str, Any] = {f"route.{index}": index for index in range(10)}
+        template: ConfigTemplate = ConfigTemplate({"name": "routes", "custom_properties": {"routes": routes}})
+        indexed: Dict[str, Any] = template.resolved["custom_properties"]["routes"]
+        self.assertIn(id(indexed), KEY_INDEXES._indexes)
+        self.assertEqual(KEY_INDEXES.best_key(indexed, "x.route.3.4"), "route.3")
+        del template, indexed
+        gc.collect()
+        self.assertNotIn(id(routes), KEY_INDEXES._indexes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+from typing import Any, Dict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.transaction import EncodedFrame, Transaction
+from hypergo.transaction_log import TransactionLog
+from hypergo.utility import SERIALIZATION_TAG
+from test_storage import MemoryStorage
+
+
+class TestTransaction(unittest.TestCase):
+    def test_stack(self) -> None:
+        transaction: Transaction = Transaction()
+        parent: str = transaction.txid
+        transaction.push()
+        child: str = transaction.txid
+        self.assertNotEqual(child, parent)
+        self.assertEqual(transaction.pop()["txid"], child)
+        self.assertEqual(transaction.txid, parent)
+        self.assertFalse(hasattr(transaction, "__dict__"))
+
+    def test_str_round_trip(self) -> None:
+        transaction: Transaction = Transaction()
+        transaction.set("plain", {"a": [1, 2]})
+        self.assertNotIn(SERIALIZATION_TAG, str(transaction))
+        transaction.set("raw", b"\x00\x01")
+        restored: Transaction = Transaction.from_str(str(transaction))
+        self.assertEqual(restored.txid, transaction.txid)
+        self.assertEqual(restored.get("raw"), b"\x00\x01")
+        self.assertEqual(restored.get("plain"), {"a": [1, 2]})
+
+    def test_frames_are_decoded_lazily(self) -> None:
+        log: TransactionLog = TransactionLog(MemoryStorage())
+        transaction: Transaction = log.new()
+        transaction.set("parent", {"big": list(range(1000))})
+        transaction.push()
+        transaction.set("child", 1)
+        key: str = log.save(transaction)
+
+        TransactionLog._states.clear()
+        restored: Transaction = log.load(key)
+        raw: Dict[str, Any] = restored._frames._stack
+        self.assertTrue(all(isinstance(data, EncodedFrame) for data in raw.values()))
+        self.assertEqual(restored.get("child"), 1)
+        self.assertEqual([isinstance(data, EncodedFrame) for data in raw.values()], [True, False])
+        parent: EncodedFrame = next(iter(raw.values()))
+        self.assertIs(restored.frames()[0][1], parent.text)
+
+        restored.pop()
+        self.assertEqual(restored.get("parent"), {"big": list(range(1000))})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.standard_components.transaction_manager.__main__ import converge
+from hypergo.transaction import Transaction
+from hypergo.transaction_log import LOG_PREFIX, TransactionLog
+from test_storage import MemoryStorage
+
+
+class TestTransactionLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: MemoryStorage = MemoryStorage()
+        TransactionLog._states.clear()
+
+    def hop(self, log: TransactionLog, key: str, name: str, value: Any) -> str:
+        transaction: Transaction = log.load(key)
+        transaction.set(name, value)
+        return log.save(transaction)
+
+    def test_hops_write_only_their_delta(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage)
+        transaction: Transaction = Transaction()
+        transaction.set("big", "x" * 10000)
+        key: str = log.save(transaction)
+        for hop in range(5):
+            key = self.hop(log, key, f"hop{hop}", hop)
+            head: str = json.loads(self.storage.files[key])["log"]
+            self.assertLess(len(self.storage.files[head]), 200)
+
+        TransactionLog._states.clear()
+        restored: Transaction = log.load(key)
+        self.assertEqual(restored.get("big"), "x" * 10000)
+        self.assertEqual([restored.get(f"hop{hop}") for hop in range(5)], list(range(5)))
+
+    def test_compaction(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage, compact_every=4)
+        key: str = log.save(Transaction())
+        for hop in range(10):
+            key = self.hop(log, key, "count", hop)
+        # only the newest snapshot and the deltas after it are kept
+        nodes: List[str] = [content for name, content in self.storage.files.items() if name.startswith(LOG_PREFIX)]
+        self.assertEqual(["frames" in json.loads(node) for node in nodes], [True, False, False])
+
+        TransactionLog._states.clear()
+        restored: Transaction = log.load(key)
+        self.assertEqual(restored.get("count"), 9)
+        self.assertLess(restored.log_depth, 4)
+
+    def test_changes_in_place_are_logged(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage, compact_every=4)
+        transaction: Transaction = Transaction()
+        transaction.set("items", [])
+        key: str = log.save(transaction)
+        for hop in range(10):
+            transaction = log.load(key)
+            transaction.get("items").append(hop)
+            if hop % 2:
+                transaction.set("hop", hop)
+            key = log.save(transaction)
+            TransactionLog._states.clear()
+            self.assertEqual(log.load(key).get("items"), list(range(hop + 1)))
+
+    def test_push_and_pop_are_logged(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage)
+        transaction: Transaction = Transaction()
+        transaction.set("parent", 1)
+        parent_key: str = log.save(transaction)
+
+        transaction = log.load(parent_key)
+        transaction.push()
+        transaction.set("child", 2)
+        child_key: str = log.save(transaction)
+        self.assertNotEqual(child_key, parent_key)
+
+        TransactionLog._states.clear()
+        transaction = log.load(child_key)
+        self.assertEqual(transaction.get("child"), 2)
+        transaction.pop()
+        self.assertEqual(log.save(transaction), parent_key)
+        self.assertEqual(log.load(parent_key).get("parent"), 1)
+
+    def test_pop_keeps_concurrent_parent_updates(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage)
+        transaction: Transaction = Transaction()
+        transaction.set("a", 1)
+        parent_key: str = log.save(transaction)
+
+        branch: Transaction = log.load(parent_key)
+        branch.push()
+        child_key: str = log.save(branch)
+        self.hop(log, parent_key, "b", 2)
+
+        branch = log.load(child_key)
+        branch.pop()
+        branch.set("c", 3)
+        self.assertEqual(log.save(branch), parent_key)
+        TransactionLog._states.clear()
+        parent: Transaction = log.load(parent_key)
+        self.assertEqual([parent.get("a"), parent.get("b"), parent.get("c")], [1, 2, 3])
+
+    def test_lost_compare_and_swap_leaves_no_node(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage)
+        key: str = log.save(Transaction())
+        save_if_version = self.storage.save_if_version
+        conflicts: List[str] = []
+
+        def conflict_once(file_name: str, content: str, version: Optional[str]) -> Optional[str]:
+            if not conflicts:
+                conflicts.append(file_name)
+                return None
+            return save_if_version(file_name, content, version)
+
+        with mock.patch.object(self.storage, "save_if_version", side_effect=conflict_once):
+            key = self.hop(log, key, "a", 1)
+        self.assertEqual(conflicts, [key])
+        self.assertEqual(len([name for name in self.storage.files if name.startswith(LOG_PREFIX)]), 2)
+        self.assertEqual(log.load(key).get("a"), 1)
+
+    def test_reads_whole_transactions(self) -> None:
+        legacy: Transaction = Transaction("1234", {"txid": "1234", "tx": "Transaction"})
+        self.storage.save("transactionkey_1234", str(legacy))
+        log: TransactionLog = TransactionLog(self.storage)
+        transaction: Transaction = log.load("transactionkey_1234")
+        self.assertEqual(transaction.get("tx"), "Transaction")
+
+        transaction.set("tx2", "Transaction2")
+        key: str = log.save(transaction)
+        self.assertEqual(log.load(key).get("tx"), "Transaction")
+
+    def test_concurrent_branches_converge_once(self) -> None:
+        log: TransactionLog = TransactionLog(self.storage)
+        key: str = log.save(log.new())
+        input_keys: List[str] = [f"branch.{branch}" for branch in range(8)]
+        barrier: threading.Barrier = threading.Barrier(len(input_keys))
+        results: List[Optional[Dict[str, Any]]] = []
+
+        def branch(routingkey: str) -> None:
+            transaction: Transaction = log.load(key)
+            barrier.wait()
+            results.append(converge(input_keys, routingkey, routingkey, transaction))
+            log.save(transaction)
+
+        threads: List[threading.Thread] = [threading.Thread(target=branch, args=(rk,)) for rk in input_keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([result for result in results if result], [{rk: rk for rk in input_keys}])
+        self.assertEqual({rk: log.load(key).get(rk) for rk in input_keys}, {rk: rk for rk in input_keys})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import unittest
+import zlib
+from typing import Any, Dict, List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo import codecs
+from hypergo.config import ConfigType
+from hypergo.envelope import Envelope
+from hypergo.executor import Executor
+from hypergo.keyring import KeyRing
+from hypergo.message import MessageType
+from hypergo.secrets import Secrets
+from hypergo.storage import Storage
+from hypergo.transform import ENCRYPTIONKEY, TransformPipeline
+from hypergo.utility import Utility
+from test_storage import MemoryStorage, get_config
+
+
+class KeySecrets(Secrets):
+    keys: Dict[str, str] = {"key-2023": KeyRing.generate_key(), "key-2024": KeyRing.generate_key()}
+
+    @classmethod
+    def get(cls, key: str) -> Any:
+        return cls.keys[key]
+
+
+class TestTransformPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage: Storage = MemoryStorage()
+        self.body: Dict[str, Any] = {"name": "Chris", "items": [1, 2, 3]}
+
+    def run_executor(self, config: ConfigType, message: MessageType) -> List[MessageType]:
+        return list(Executor(config, storage=self.storage).execute(message))
+
+    def test_unconfigured_operations_are_dropped(self) -> None:
+        pipeline: TransformPipeline = TransformPipeline(get_config({}, {"compression": ["message.body"]}), self.storage)
+        self.assertEqual(len(pipeline.input_stages), 2)
+        # transaction, compression, envelope sealing, contextualization
+        self.assertEqual(len(pipeline.output_stages), 4)
+
+    def test_round_trip_through_operations(self) -> None:
+        operations: Dict[str, Any] = {
+            "serialization": ["message.body"],
+            "compression": ["message.body"],
+            "encryption": ["message.body"],
+            "pass_by_reference": ["message.body"],
+        }
+        [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": self.body})
+        self.assertIsInstance(produced["body"], str)
+        self.assertEqual(produced["routingkey"], "b.x")
+
+        [consumed] = self.run_executor(get_config(operations, {}), {"routingkey": "a.y", "body": produced["body"]})
+        self.assertEqual(consumed["body"], self.body)
+
+    def test_envelope_is_encoded_once(self) -> None:
+        operations: Dict[str, Any] = {"compression": ["message.body"], "encryption": ["message.body"]}
+        [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": self.body})
+        self.assertTrue(Envelope.is_encoded(produced["body"]))
+        self.assertEqual(Envelope.decode(produced["body"]).layers, [["fernet"], ["lzma"]])
+
+    def test_compression_codec_per_key(self) -> None:
+        for codec in ["zlib", "bz2", "lzma"]:
+            operations: Dict[str, Any] = {"compression": {"message.body": {"codec": codec, "level": 1}}}
+            [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": self.body})
+            self.assertEqual(Envelope.decode(produced["body"]).layers, [[codec]])
+
+            [consumed] = self.run_executor(
+                get_config({"compression": ["message.body"]}, {}), {"routingkey": "a.y", "body": produced["body"]}
+            )
+            self.assertEqual(consumed["body"], self.body)
+
+    def test_compression_threshold(self) -> None:
+        for body in [self.body, "short"]:
+            operations: Dict[str, Any] = {"compression": {"message.body": {"threshold": 1024}}}
+            [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": body})
+            if isinstance(body, str):
+                self.assertEqual(Envelope.decode(produced["body"]).layers, [])
+            else:
+                self.assertEqual(produced["body"], body)
+
+            [consumed] = self.run_executor(
+                get_config({"compression": ["message.body"]}, {}), {"routingkey": "a.y", "body": produced["body"]}
+            )
+            self.assertEqual(consumed["body"], body)
+
+    def test_dictionary_compression(self) -> None:
+        with open(os.path.join(SCRIPT_DIR, "test.json"), "r", encoding="utf-8") as file:
+            records: List[Dict[str, Any]] = json.load(file)
+        zdict: bytes = codecs.train_dictionary(json.dumps(record).encode("utf-8") for record in records[:3])
+        dictionary_id: str = codecs.Dictionaries(self.storage.use_sub_path("dictionaries")).save(zdict)
+        codecs.Dictionaries._loaded.clear()
+
+        operations: Dict[str, Any] = {"compression": {"message.body": {"dictionary": dictionary_id}}}
+        for record in records[3:]:
+            [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": record})
+            envelope: Envelope = Envelope.decode(produced["body"])
+            self.assertEqual(envelope.layers, [["zdict", dictionary_id]])
+            self.assertLess(len(envelope.payload), len(zlib.compress(json.dumps(record).encode("utf-8"))))
+
+            [consumed] = self.run_executor(
+                get_config({"compression": ["message.body"]}, {}), {"routingkey": "a.y", "body": produced["body"]}
+            )
+            self.assertEqual(consumed["body"], record)
+
+    def test_utility_uncompress_reads_any_codec(self) -> None:
+        for codec in [None, "zlib", "bz2", "lzma"]:
+            compressed: Dict[str, Any] = Utility.compress({"body": self.body}, "body", codec)
+            self.assertEqual(Utility.uncompress(compressed, "body"), {"body": self.body})
+
+    def test_claim_check(self) -> None:
+        operations: Dict[str, Any] = {"pass_by_reference": {"message.body": {"threshold": 100}}}
+        key: str = f"storagekey_{Utility.hash('x')}"
+        for body, offloaded in [(self.body, False), ({"text": "x" * 100}, True), (key, True)]:
+            [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": body})
+            self.assertEqual(produced["body"] != body, offloaded)
+
+            [consumed] = self.run_executor(
+                get_config({"pass_by_reference": ["message.body"]}, {}), {"routingkey": "a.y", "body": produced["body"]}
+            )
+            self.assertEqual(consumed["body"], body)
+
+    def test_claim_check_offloads_oversized_messages(self) -> None:
+        operations: Dict[str, Any] = {"pass_by_reference": {"message.body": {"threshold": 100}}}
+        executor: Executor = Executor(get_config({}, operations), storage=self.storage, max_message_size=40)
+        [produced] = list(executor.execute({"routingkey": "a.x", "body": self.body}))
+        self.assertNotEqual(produced["body"], self.body)
+
+    def test_lazy_field_access(self) -> None:
+        body: Dict[str, Any] = {"profile": {"name": "Chris", "tags": ["a"]}, "history": list(range(1000))}
+        operations: Dict[str, Any] = {"pass_by_reference": {"message.body": {"index": True}}}
+        [produced] = self.run_executor(get_config({}, operations), {"routingkey": "a.x", "body": body})
+
+        config: ConfigType = get_config({"pass_by_reference": {"message.body": {"lazy": True}}}, {})
+        config["input_bindings"] = ["{message.body.profile.name}"]
+        self.storage.loads.clear()
+        [consumed] = self.run_executor(config, {"routingkey": "a.y", "body": produced["body"]})
+        self.assertEqual(consumed["body"], "Chris")
+        blob: str = os.path.join("passbyreference", produced["body"])
+        self.assertNotIn(blob, self.storage.loads)
+
+        config["input_bindings"] = ["{message.body}"]
+        [consumed] = self.run_executor(config, {"routingkey": "a.y", "body": produced["body"]})
+        self.assertEqual(consumed["body"], body)
+
+    def test_aesgcm_key_rotation(self) -> None:
+        reader: ConfigType = get_config({"encryption": ["message.body"]}, {})
+        for key_id in ["key-2023", "key-2024"]:
+            operations: Dict[str, Any] = {"encryption": {"message.body": {"cipher": "aesgcm", "key_id": key_id}}}
+            [produced] = list(
+                Executor(get_config({}, operations), storage=self.storage, secrets=KeySecrets()).execute(
+                    {"routingkey": "a.x", "body": self.body}
+                )
+            )
+            self.assertEqual(Envelope.decode(produced["body"]).layers, [["aesgcm", key_id]])
+            [consumed] = list(
+                Executor(reader, storage=self.storage, secrets=KeySecrets()).execute(
+                    {"routingkey": "a.y", "body": produced["body"]}
+                )
+            )
+            self.assertEqual(consumed["body"], self.body)
+
+    def test_ciphers_are_cached(self) -> None:
+        keyring: KeyRing = KeyRing(KeySecrets())
+        self.assertIs(keyring.cipher("aesgcm", "key-2024"), keyring.cipher("aesgcm", "key-2024"))
+        self.assertIsNot(keyring.cipher("aesgcm", "key-2024"), keyring.cipher("aesgcm", "key-2023"))
+        with self.assertRaises(ValueError):
+            keyring.cipher("rot13")
+
+    def test_reads_legacy_messages(self) -> None:
+        legacy: Dict[str, Any] = Utility.encrypt({"body": self.body}, "body", ENCRYPTIONKEY)
+        legacy = Utility.compress(legacy, "body")
+        operations: Dict[str, Any] = {"compression": ["message.body"], "encryption": ["message.body"]}
+        [consumed] = self.run_executor(get_config(operations, {}), {"routingkey": "a.y", "body": legacy["body"]})
+        self.assertEqual(consumed["body"], self.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import random
+import sys
+import unittest
+from typing import Any, Callable, Dict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from hypergo.traversal import traverse
+
+
+def recursive_traverse(func: Callable[..., Any]) -> Callable[..., Any]:
+    """The original recursive traverse_datastructures, which copies every container; kept for comparison."""
+
+    def wrapper(value: Any, *args: Any) -> Any:
+        handlers: Dict[type, Callable[..., Any]] = {
+            dict: lambda _dict, *args: {wrapper(key, *args): wrapper(val, *args) for key, val in _dict.items()},
+            list: lambda _list, *args: [wrapper(item, *args) for item in _list],
+            tuple: lambda _tuple, *args: tuple(wrapper(item, *args) for item in _tuple),
+        }
+        return handlers.get(type(value), func)(value, *args)
+
+    return wrapper
+
+
+def shout(value: Any) -> Any:
+    return value.upper() if isinstance(value, str) and value.startswith("x") else value
+
+
+def random_value(depth: int = 0) -> Any:
+    choice: float = random.random()
+    if depth > 4 or choice < 0.4:
+        return random.choice([1, 2.5, None, True, "a", "xa", "xb", ""])
+    if choice < 0.6:
+        return [random_value(depth + 1) for _ in range(random.randint(0, 3))]
+    if choice < 0.7:
+        return tuple(random_value(depth + 1) for _ in range(random.randint(0, 3)))
+    return {random.choice(["k", "xk", 1, ("xt", 2)]): random_value(depth + 1) for _ in range(random.randint(0, 3))}
+
+
+class TestTraversal(unittest.TestCase):
+    def test_matches_recursive_traversal(self) -> None:
+        random.seed(7)
+        for _ in range(2000):
+            value: Any = random_value()
+            expected: Any = recursive_traverse(shout)(value)
+            result: Any = traverse(value, shout)
+            self.assertEqual(result, expected)
+            self.assertEqual(repr(result), repr(expected))
+
+    def test_unchanged_subtrees_are_shared(self) -> None:
+        value: Any = {"same": {"a": [1, 2]}, "changed": ["xa", ("b",)]}
+        result: Any = traverse(value, shout)
+        self.assertIsNot(result, value)
+        self.assertIs(result["same"], value["same"])
+        self.assertIs(result["changed"][1], value["changed"][1])
+        self.assertEqual(result["changed"][0], "XA")
+        self.assertIs(traverse(value["same"], shout), value["same"])
+
+    def test_prune(self) -> None:
+        visited: list = []
+        value: Any = {"skip": ["xa"], "keep": ["xb"]}
+        result: Any = traverse(value, lambda leaf: visited.append(leaf) or shout(leaf), lambda node: node == ["xa"])
+        self.assertEqual(result, {"skip": ["xa"], "keep": ["XB"]})
+        self.assertNotIn("xa", visited)
+
+    def test_deep_nesting(self) -> None:
+        value: Any = "xa"
+        for _ in range(sys.getrecursionlimit() * 2):
+            value = [value]
+        result: Any = traverse(value, shout)
+        for _ in range(sys.getrecursionlimit() * 2):
+            result = result[0]
+        self.assertEqual(result, "XA")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@ import sys
 import unittest
 from unittest.mock import MagicMock
 
-from typing import Dict
+from typing import Any, Dict
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
@@ -51,6 +51,24 @@ class TestUtility(unittest.TestCase):
         Utility.deep_set(input_dict, key, val)
         self.assertEqual(input_dict, expected_output)
 
+    def test_deep_paths(self) -> None:
+        input_dict: Dict[str, Any] = {"a": {"b.c": [{"d": 1}, {"d": 2}]}}
+        self.assertTrue(Utility.deep_has(input_dict, "a.b\\.c.1.d"))
+        self.assertEqual(Utility.deep_get(input_dict, "a.b\\.c[1].d"), 2)
+        self.assertFalse(Utility.deep_has(input_dict, "a.b\\.c.2.d"))
+        self.assertEqual(Utility.deep_get(input_dict, "a.b\\.c.2.d", None), None)
+
+        Utility.deep_set(input_dict, "a.x[1].y", 3)
+        self.assertEqual(input_dict["a"]["x"], [None, {"y": 3}])
+
+        Utility.deep_del(input_dict, "a.b\\.c")
+        self.assertEqual(input_dict, {"a": {"x": [None, {"y": 3}]}})
+
+    def test_deep_get_error_message(self) -> None:
+        with self.assertRaises(KeyError) as context:
+            Utility.deep_get({"a": {"b": 1}}, "a.c")
+        self.assertEqual(str(context.exception), 'Spec "a.c" not found in the dictionary {"a": {"b": 1}}')
+
     def test_yaml_read(self) -> None:
         # Mock the yaml.safe_load method
         yaml.safe_load = MagicMock(return_value={"a": 1})
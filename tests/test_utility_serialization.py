@@ -1,11 +1,14 @@
+import base64
 import os
 import sys
 import unittest
 
+import dill
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
-from hypergo.utility import Utility
+from hypergo.utility import SERIALIZATION_TAG, Utility
 
 
 class TestUtility(unittest.TestCase):
@@ -73,6 +76,32 @@ class TestUtility(unittest.TestCase):
         restored_comprehensive = Utility.deserialize(json_comprehensive, None)
         self.assertEqual(restored_comprehensive, comprehensive_dict)
 
+    def test_json_native_values_pass_through(self):
+        body = {"name": "gAbc", "items": [1, 2.5, None, True], "nested": {"text": "Hello"}}
+        self.assertIs(Utility.serialize_value(body), body)
+        self.assertIs(Utility.deserialize_value(body), body)
+
+    def test_tagged_values(self):
+        serialized = Utility.serialize_value({"set": {1, 2}, "text": "plain"})
+        self.assertEqual(serialized["set"][SERIALIZATION_TAG], "pickle")
+        self.assertEqual(serialized["text"], "plain")
+        self.assertEqual(Utility.deserialize_value(serialized), {"set": {1, 2}, "text": "plain"})
+
+    def test_tag_key_in_data(self):
+        data = {SERIALIZATION_TAG: "pickle", "data": "not a pickle"}
+        self.assertEqual(Utility.deserialize_value(Utility.serialize_value(data)), data)
+
+    def test_reads_legacy_format(self):
+        legacy = base64.b64encode(dill.dumps({1, 2})).decode("utf-8")
+        self.assertEqual(Utility.deserialize({"body": legacy}, "body"), {"body": {1, 2}})
+
+    def test_serializes_the_whole_value_whatever_the_key(self):
+        data = {"body": {3, 4}, "other": {5, 6}}
+        serialized = Utility.serialize(data, "body")
+        self.assertEqual(serialized["other"][SERIALIZATION_TAG], "pickle")
+        self.assertEqual(data["other"], {5, 6})
+        self.assertEqual(Utility.deserialize(serialized, "body"), {"body": {3, 4}, "other": {5, 6}})
+
 
 def get_fixture():
     # Importing required modules for binary data and bytes